@@ -0,0 +1,173 @@
+"""Configuração do engine do banco de dados e cópia entre bancos.
+
+O banco vem de DATABASE_URL (SQLite ou PostgreSQL; sem ela, o arquivo
+instance/bancoAgendamentos.db). Os dois usam um pool de conexões
+reaproveitadas pelas threads (DB_POOL_SIZE e DB_MAX_OVERFLOW).
+
+SQLite em arquivo:
+- WAL: leituras não esperam as gravações (nem o contrário); só as gravações
+  continuam uma de cada vez, esperando até SQLITE_BUSY_TIMEOUT_MS pelo lock
+  em vez de falhar com "database is locked".
+- Pragmas de desempenho (sincronização, cache de páginas, mmap, temporários
+  em memória) aplicados a cada conexão aberta.
+- Pool de conexões: o padrão do SQLAlchemy 1.4 para arquivos SQLite é o
+  NullPool, que abre uma conexão nova (com o cache de páginas vazio) a cada
+  requisição.
+
+Cada pragma configurado como None fica com o padrão do SQLite.
+
+PostgreSQL: conexões testadas antes do uso (DB_POOL_PRE_PING) e renovadas
+após DB_POOL_RECYCLE segundos, para sobreviver a reinícios do servidor e a
+conexões derrubadas por proxies.
+"""
+from sqlalchemy import Integer, event, func, inspect, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Pragma -> chave de configuração
+PRAGMAS_SQLITE = {
+    'journal_mode': 'SQLITE_JOURNAL_MODE',
+    'synchronous': 'SQLITE_SYNCHRONOUS',
+    'busy_timeout': 'SQLITE_BUSY_TIMEOUT_MS',
+    'cache_size': 'SQLITE_CACHE_SIZE_KB',
+    'mmap_size': 'SQLITE_MMAP_SIZE',
+    'temp_store': 'SQLITE_TEMP_STORE',
+    'journal_size_limit': 'SQLITE_JOURNAL_SIZE_LIMIT',
+}
+
+
+def uri_banco(valor, padrao):
+    """URI do SQLAlchemy a partir de DATABASE_URL (ou `padrao`, se vazia).
+
+    Aceita o esquema postgres://, usado por vários provedores e removido do
+    SQLAlchemy 1.4.
+    """
+    if not valor:
+        return padrao
+    if valor.startswith('postgres://'):
+        return 'postgresql://' + valor[len('postgres://'):]
+    return valor
+
+
+def sqlite_em_arquivo(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def opcoes_engine(config):
+    """SQLALCHEMY_ENGINE_OPTIONS para o banco de SQLALCHEMY_DATABASE_URI.
+
+    Opções já presentes em SQLALCHEMY_ENGINE_OPTIONS têm precedência.
+    """
+    opcoes = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    uri = config['SQLALCHEMY_DATABASE_URI']
+
+    if sqlite_em_arquivo(uri):
+        opcoes.setdefault('poolclass', QueuePool)
+        # As conexões do pool passam de uma thread para outra (usadas por uma de cada vez)
+        opcoes['connect_args'] = {'check_same_thread': False, **opcoes.get('connect_args', {})}
+    elif make_url(uri).get_backend_name() == 'postgresql':
+        opcoes.setdefault('pool_pre_ping', config.get('DB_POOL_PRE_PING', True))
+        opcoes.setdefault('pool_recycle', config.get('DB_POOL_RECYCLE', 1800))
+    else:
+        return opcoes
+
+    opcoes.setdefault('pool_size', config.get('DB_POOL_SIZE', 10))
+    opcoes.setdefault('max_overflow', config.get('DB_MAX_OVERFLOW', 10))
+    return opcoes
+
+
+def pragmas_sqlite(config):
+    """Comandos PRAGMA configurados, na ordem em que são aplicados."""
+    pragmas = []
+    for nome, chave in PRAGMAS_SQLITE.items():
+        valor = config.get(chave)
+        if valor is None:
+            continue
+        if nome == 'cache_size':
+            valor = -valor  # valores negativos são em KiB, não em páginas
+        pragmas.append(f'PRAGMA {nome} = {valor}')
+    return pragmas
+
+
+def configurar_engine(engine, config):
+    """Aplica os pragmas do SQLite a cada conexão nova do `engine`."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = pragmas_sqlite(config)
+
+    @event.listens_for(engine, 'connect')
+    def aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+# --- Cópia entre bancos ---
+
+def tabelas_com_dados(connection, metadata):
+    """Nomes das tabelas de `metadata` que já têm linhas no banco da conexão."""
+    return [
+        tabela.name for tabela in metadata.sorted_tables
+        if connection.execute(select(tabela).limit(1)).first() is not None
+    ]
+
+
+def colunas_faltantes(connection, metadata):
+    """(tabela, coluna) dos models que não existem no banco da conexão."""
+    existentes = inspect(connection)
+    faltantes = []
+    for tabela in metadata.sorted_tables:
+        if not existentes.has_table(tabela.name):
+            faltantes.extend((tabela.name, coluna.name) for coluna in tabela.columns)
+            continue
+        nomes = {coluna['name'] for coluna in existentes.get_columns(tabela.name)}
+        faltantes.extend((tabela.name, coluna.name) for coluna in tabela.columns if coluna.name not in nomes)
+    return faltantes
+
+
+def copiar_tabelas(origem, destino, metadata, lote=5000, progresso=None):
+    """Copia as linhas de todas as tabelas de `metadata`, da conexão `origem` para `destino`.
+
+    As tabelas são copiadas na ordem das chaves estrangeiras, em lotes de
+    `lote` linhas (INSERT com vários valores no PostgreSQL) e com os ids
+    originais. `progresso(tabela, linhas)` é chamado no início de cada tabela
+    e após cada lote.
+    Retorna {tabela: linhas copiadas}.
+    """
+    copiadas = {}
+    for tabela in metadata.sorted_tables:
+        copiadas[tabela.name] = 0
+        if progresso:
+            progresso(tabela.name, 0)
+        resultado = origem.execution_options(stream_results=True).execute(
+            select(tabela).order_by(*tabela.primary_key.columns)
+        )
+        while True:
+            linhas = resultado.fetchmany(lote)
+            if not linhas:
+                break
+            destino.execute(tabela.insert(), [dict(linha._mapping) for linha in linhas])
+            copiadas[tabela.name] += len(linhas)
+            if progresso:
+                progresso(tabela.name, copiadas[tabela.name])
+    return copiadas
+
+
+def ajustar_sequencias(connection, metadata):
+    """Avança as sequências das chaves primárias do PostgreSQL após inserir ids explícitos."""
+    if connection.dialect.name != 'postgresql':
+        return
+    preparer = connection.dialect.identifier_preparer
+    for tabela in metadata.sorted_tables:
+        chave = list(tabela.primary_key.columns)
+        if len(chave) != 1 or not isinstance(chave[0].type, Integer):
+            continue
+        # pg_get_serial_sequence devolve NULL (e o setval é ignorado) se a coluna não tiver sequência
+        proximo = select(func.coalesce(func.max(chave[0]), 0) + 1).scalar_subquery()
+        connection.execute(select(func.setval(
+            func.pg_get_serial_sequence(preparer.format_table(tabela), chave[0].name), proximo, False
+        )))
@@ -0,0 +1,65 @@
+"""Compara a busca livre com LIKE e com o índice FTS5.
+
+Uso:
+    python benchmarks/bench_busca.py --linhas 200000
+
+Cria um banco SQLite temporário, popula com agendamentos sintéticos e executa
+as mesmas buscas de `build_booking_query` pelos dois caminhos, conferindo que
+retornam os mesmos agendamentos.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time as timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Agendamento
+from search import aplicar_busca
+from dados import criar_app, popular
+
+# Termos como digitados no campo de busca (separados por vírgula)
+BUSCAS = [
+    'matricula',
+    'Matrícula, comercial',
+    'Ana Silva',
+    'coordenacao, bolsa, financeiro',
+    'Souza, Ensino Médio',
+]
+
+
+def medir(termos, usar_fts, repeticoes):
+    query = aplicar_busca(Agendamento.query, termos, usar_fts=usar_fts)
+    inicio = timer.perf_counter()
+    for _ in range(repeticoes):
+        query.with_entities(Agendamento.id).limit(51).all()
+    tempo = (timer.perf_counter() - inicio) / repeticoes * 1000
+    total = query.count()
+    return tempo, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=200000)
+    parser.add_argument('--repeticoes', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = criar_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            print(f'Populando {args.linhas} agendamentos...')
+            popular(db.session, Agendamento.__table__, args.linhas)
+
+            print(f"{'Busca':35} {'LIKE (ms)':>10} {'FTS5 (ms)':>10} {'resultados':>11}")
+            for busca in BUSCAS:
+                termos = [t.strip() for t in busca.split(',')]
+                tempo_like, total_like = medir(termos, False, args.repeticoes)
+                tempo_fts, total_fts = medir(termos, True, args.repeticoes)
+                # FTS casa palavras por prefixo; LIKE casa qualquer trecho e diferencia acentos
+                print(f'{busca:35} {tempo_like:10.2f} {tempo_fts:10.2f} {total_like:>5}/{total_fts:<5}')
+
+
+if __name__ == '__main__':
+    main()
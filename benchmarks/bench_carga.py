@@ -0,0 +1,255 @@
+"""Teste de carga das rotas principais por perfil: latência, consultas SQL e memória.
+
+Uso:
+    python benchmarks/bench_carga.py --agendamentos 50000
+    python benchmarks/popular_banco.py --agendamentos 1000000 --banco /tmp/carga.db
+    python benchmarks/bench_carga.py --banco /tmp/carga.db --saida carga.json
+    python benchmarks/bench_carga.py --banco /tmp/carga.db --comparar carga.json
+
+Sem --banco, cria um banco temporário com `popular_banco`. Para cada perfil
+(admin, financeiro e coordenação) entra no app pelo test client do Flask e
+repete as requisições de cada cenário: dashboard, busca rápida, checkout
+(alteração de status), exportação Excel e PDF (enfileirado e acompanhado até
+terminar). Os relatórios são sempre gerados do zero (o cache em disco é
+limpo antes de cada requisição) e o PDF é filtrado pelo dia com mais
+agendamentos visíveis para o perfil.
+
+Por cenário informa os percentis de latência, a média de consultas SQL por
+requisição e o pico de memória alocada (tracemalloc, numa requisição extra
+fora da medição de tempo). Com --saida os resultados são gravados em JSON e
+com --comparar é mostrada a variação do p95 em relação a uma execução
+anterior, para que regressões fiquem visíveis.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time as timer
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from popular_banco import COORDENADOR_CARGA, popular_banco
+
+# Perfil -> (usuário, senha)
+PERFIS = {
+    'admin': ('admin', 'admin'),
+    'financeiro': ('financeiro', 'financeiro'),
+    'coordenacao': (COORDENADOR_CARGA, COORDENADOR_CARGA),
+}
+CENARIOS = ['dashboard', 'busca', 'checkout', 'excel', 'pdf']
+# Cenários que geram relatórios completos: menos repetições
+RELATORIOS = {'excel', 'pdf'}
+# Termos como digitados no campo de busca
+TERMOS = ['Silva', 'Maria Souza', 'matricula', 'Ensino Médio', 'bolsa, whatsapp']
+
+
+def percentil(valores, fracao):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, round(fracao * (len(ordenados) - 1)))]
+
+
+def entrar(app, usuario, senha):
+    cliente = app.test_client()
+    cliente.post('/login', data={'username': usuario, 'password': senha})
+    if cliente.get('/dashboard').status_code != 200:
+        sys.exit(f'Não foi possível entrar como {usuario}.')
+    return cliente
+
+
+def preparar(app, cliente, usuario, quantidade):
+    """Funções que fazem uma requisição de cada cenário para o perfil; recebem o número da repetição."""
+    from sqlalchemy import func
+    from app import allowed_statuses, apply_profile_scope, financeiro_setor_id, reference_id, reference_names, sends_to_financeiro
+    from jobs import CONCLUIDO, ERRO
+    from models import db, Agendamento
+
+    with app.app_context():
+        escopo = apply_profile_scope(Agendamento.query, usuario)
+
+        # Checkout: agendamentos que o perfil pode alterar e status que não os tiram do seu escopo
+        statuses = [s for s in allowed_statuses(usuario) if not sends_to_financeiro(s)] or allowed_statuses(usuario)
+        editaveis = escopo.with_entities(Agendamento.id, Agendamento.setor_id)
+        if not usuario.is_admin and usuario.perfil != 'financeiro':
+            editaveis = editaveis.filter(
+                Agendamento.status_id.in_([reference_id('statuses', s) for s in statuses]),
+                Agendamento.setor_id != financeiro_setor_id()
+            )
+        setores = reference_names('setores')
+        editaveis = editaveis.all()
+        checkouts = [(id_, setores[setor_id]) for id_, setor_id in
+                     random.Random(42).sample(editaveis, min(quantidade, len(editaveis)))]
+
+        dia_pdf = escopo.with_entities(Agendamento.data_agendamento).group_by(
+            Agendamento.data_agendamento
+        ).order_by(func.count().desc()).limit(1).scalar()
+
+    erros = []
+
+    def ok(resposta, esperado=200):
+        if resposta.status_code != esperado:
+            erros.append(f'HTTP {resposta.status_code}')
+            return False
+        return True
+
+    def limpar_cache():
+        from cache import report_cache
+        for nome in os.listdir(report_cache.diretorio):
+            os.remove(os.path.join(report_cache.diretorio, nome))
+
+    def dashboard(_):
+        return ok(cliente.get('/dashboard'))
+
+    def busca(i):
+        return ok(cliente.get('/api/agendamentos/busca', query_string={'q': TERMOS[i % len(TERMOS)]}))
+
+    def checkout(i):
+        id_, setor = checkouts[i % len(checkouts)]
+        resposta = cliente.post(f'/agendamento/checkout/{id_}',
+                                data={'status': statuses[i % len(statuses)], 'setor': setor})
+        return ok(resposta, 302)
+
+    def excel(_):
+        limpar_cache()
+        return ok(cliente.get('/export_excel'))
+
+    def pdf(_):
+        limpar_cache()
+        resposta = cliente.post('/download_pdf', data={'data': dia_pdf.isoformat()})
+        if not ok(resposta, 202):
+            return False
+        while True:
+            tarefa = cliente.get(resposta.json['status_url']).json
+            if tarefa['status'] == CONCLUIDO:
+                return True
+            if tarefa['status'] == ERRO:
+                erros.append(tarefa['erro'])
+                return False
+            timer.sleep(0.02)
+
+    return {'dashboard': dashboard, 'busca': busca, 'checkout': checkout, 'excel': excel, 'pdf': pdf}, erros
+
+
+def medir(requisicao, repeticoes, contador):
+    requisicao(0)  # aquecimento (caches de referência, planos de consulta)
+
+    tempos, falhas = [], 0
+    consultas_antes = contador[0]
+    for i in range(1, repeticoes + 1):
+        inicio = timer.perf_counter()
+        falhas += not requisicao(i)
+        tempos.append((timer.perf_counter() - inicio) * 1000)
+    consultas = (contador[0] - consultas_antes) / repeticoes
+
+    tracemalloc.start()
+    requisicao(repeticoes + 1)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'n': repeticoes,
+        'p50': percentil(tempos, 0.50),
+        'p95': percentil(tempos, 0.95),
+        'p99': percentil(tempos, 0.99),
+        'max': max(tempos),
+        'consultas': consultas,
+        'memoria_mb': pico / 1024 / 1024,
+        'falhas': falhas,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--banco', help='Banco SQLite já populado por popular_banco.py.')
+    parser.add_argument('--agendamentos', type=int, default=20000, help='Tamanho do banco temporário (sem --banco).')
+    parser.add_argument('--repeticoes', type=int, default=30)
+    parser.add_argument('--repeticoes-relatorios', type=int, default=3)
+    parser.add_argument('--perfis', default=','.join(PERFIS))
+    parser.add_argument('--cenarios', default=','.join(CENARIOS))
+    parser.add_argument('--saida', help='Grava os resultados em JSON.')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior.')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench_carga_')
+    caminho = os.path.abspath(args.banco) if args.banco else os.path.join(tmp, 'carga.db')
+    # Antes de importar o app, que lê DATABASE_URL na inicialização
+    os.environ['DATABASE_URL'] = f'sqlite:///{caminho}'
+    from sqlalchemy import event
+    from app import app
+    from cache import report_cache
+    from jobs import report_jobs
+    from models import db, User
+
+    # Relatórios do teste não se misturam com os do banco do app
+    for gerenciador, nome in ((report_cache, 'cache'), (report_jobs, 'relatorios')):
+        gerenciador.diretorio = os.path.join(tmp, nome)
+        os.makedirs(gerenciador.diretorio)
+
+    try:
+        if not args.banco:
+            print(f'Populando banco temporário com {args.agendamentos} agendamentos...')
+            popular_banco(app, args.agendamentos)
+
+        contador = [0]
+        with app.app_context():
+            @event.listens_for(db.engine, 'before_cursor_execute')
+            def contar(*_):
+                contador[0] += 1
+
+        resultados = []
+        print(f"{'perfil':12} {'cenário':10} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+              f"{'max ms':>9} {'SQL/req':>8} {'pico MB':>8} {'falhas':>7}")
+        for perfil in args.perfis.split(','):
+            usuario_nome, senha = PERFIS[perfil]
+            cliente = entrar(app, usuario_nome, senha)
+            with app.app_context():
+                usuario = User.query.filter_by(username=usuario_nome).one()
+                db.session.expunge(usuario)
+            requisicoes, erros = preparar(app, cliente, usuario, args.repeticoes + 2)
+
+            for cenario in args.cenarios.split(','):
+                repeticoes = args.repeticoes_relatorios if cenario in RELATORIOS else args.repeticoes
+                resultado = medir(requisicoes[cenario], repeticoes, contador)
+                resultado.update(perfil=perfil, cenario=cenario, erro=erros[-1] if erros else None)
+                erros.clear()
+                resultados.append(resultado)
+                imprimir(resultado)
+
+        print(f'Pico de memória do processo (RSS): {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB')
+        if args.saida:
+            with open(args.saida, 'w', encoding='utf-8') as arquivo:
+                json.dump(resultados, arquivo, ensure_ascii=False, indent=2)
+        if args.comparar:
+            comparar(resultados, args.comparar)
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def imprimir(r):
+    print(f"{r['perfil']:12} {r['cenario']:10} {r['n']:4} {r['p50']:9.1f} {r['p95']:9.1f} {r['p99']:9.1f} "
+          f"{r['max']:9.1f} {r['consultas']:8.1f} {r['memoria_mb']:8.1f} {r['falhas']:7}")
+    if r['erro']:
+        print(f"{'':23} último erro: {r['erro']}")
+
+
+def comparar(resultados, arquivo_anterior):
+    with open(arquivo_anterior, encoding='utf-8') as arquivo:
+        anteriores = {(r['perfil'], r['cenario']): r for r in json.load(arquivo)}
+    print(f"\nComparação com {arquivo_anterior} (p95 e consultas por requisição):")
+    for r in resultados:
+        anterior = anteriores.get((r['perfil'], r['cenario']))
+        if not anterior:
+            continue
+        variacao = (r['p95'] / anterior['p95'] - 1) * 100 if anterior['p95'] else 0.0
+        print(f"{r['perfil']:12} {r['cenario']:10} {anterior['p95']:9.1f} -> {r['p95']:9.1f} ms "
+              f"({variacao:+.0f}%)   SQL {anterior['consultas']:.1f} -> {r['consultas']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
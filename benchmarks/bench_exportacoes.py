@@ -0,0 +1,91 @@
+"""Compara throughput, memória e tamanho dos arquivos exportados em Excel, CSV e Parquet.
+
+Uso:
+    python benchmarks/bench_exportacoes.py --linhas 200000
+
+Usa um banco SQLite temporário e as mesmas funções de reports.py chamadas
+pelas rotas /export_excel, /export_csv e /export_parquet.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time as timer
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Agendamento
+from reports import iter_export_rows, iter_csv, write_excel, write_parquet
+from dados import criar_app, popular
+
+
+def consulta():
+    return Agendamento.query.order_by(
+        Agendamento.data_agendamento.desc(),
+        Agendamento.horario.desc(),
+        Agendamento.id.desc()
+    )
+
+
+def exportar_excel(caminho):
+    with open(caminho, 'wb') as arquivo:
+        write_excel(iter_export_rows(consulta()), arquivo)
+
+
+def exportar_csv(caminho):
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        for bloco in iter_csv(iter_export_rows(consulta(), formatar=False)):
+            arquivo.write(bloco)
+
+
+def exportar_parquet(caminho):
+    with open(caminho, 'wb') as arquivo:
+        write_parquet(iter_export_rows(consulta(), formatar=False), arquivo)
+
+
+FORMATOS = [
+    ('Excel', '.xlsx', exportar_excel),
+    ('CSV', '.csv', exportar_csv),
+    ('Parquet', '.parquet', exportar_parquet),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = criar_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            print(f'Populando {args.linhas} agendamentos...')
+            popular(db.session, Agendamento.__table__, args.linhas)
+
+            print(f'\n{"Formato":<10}{"tempo (s)":>12}{"linhas/s":>12}{"tamanho (MB)":>15}{"pico Python (MB)":>19}')
+            for nome, extensao, exportar in FORMATOS:
+                caminho = os.path.join(tmp, 'saida' + extensao)
+                try:
+                    # Tempo medido sem o tracemalloc, que deixa a execução bem mais lenta
+                    inicio = timer.perf_counter()
+                    exportar(caminho)
+                    duracao = timer.perf_counter() - inicio
+                    db.session.remove()
+
+                    tracemalloc.start()
+                    exportar(caminho)
+                    _, pico = tracemalloc.get_traced_memory()
+                    db.session.remove()
+                except ImportError as e:
+                    print(f'{nome:<10}  ignorado ({e})')
+                    continue
+                finally:
+                    tracemalloc.stop()
+
+                tamanho = os.path.getsize(caminho) / 1024 / 1024
+                print(f'{nome:<10}{duracao:>12.2f}{args.linhas / duracao:>12.0f}{tamanho:>15.2f}{pico / 1024 / 1024:>19.1f}')
+
+
+if __name__ == '__main__':
+    main()
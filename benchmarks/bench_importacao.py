@@ -0,0 +1,92 @@
+"""Compara a importação em lote com o cadastro de um agendamento por vez.
+
+Uso:
+    python benchmarks/bench_importacao.py --linhas 20000
+
+Cria bancos SQLite temporários e grava os mesmos agendamentos sintéticos de
+duas formas: como `novo_agendamento` faz (consulta de conflito e commit por
+agendamento) e com `importacao.importar` (validação vetorizada e INSERT em
+lote). Linhas que conflitam com outras são descartadas nos dois caminhos.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time as timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from models import db, Agendamento, User, verificar_estatisticas
+from importacao import importar
+from dados import cadastrar_referencias, criar_app, gerar_agendamentos
+
+
+def planilha(quantidade):
+    """Agendamentos sintéticos no formato do Excel exportado (textos)."""
+    df = pd.DataFrame(gerar_agendamentos(quantidade))
+    df['data_agendamento'] = pd.to_datetime(df['data_agendamento']).dt.strftime('%d/%m/%Y')
+    df['horario'] = df['horario'].map(lambda h: h.strftime('%H:%M'))
+    return df.fillna('').astype(str)
+
+
+def um_por_vez(df):
+    # Como no app, o id do coordenador vem de um cache em memória
+    coordenadores = {u.username: u.id for u in User.query}
+    for linha in df.to_dict('records'):
+        data_agendamento = pd.to_datetime(linha['data_agendamento'], format='%d/%m/%Y').date()
+        horario = pd.to_datetime(linha['horario'], format='%H:%M').time()
+        conflito = Agendamento.query.filter_by(
+            data_agendamento=data_agendamento,
+            horario=horario,
+            coordenador_id=coordenadores[linha['coordenador']]
+        ).first()
+        if conflito:
+            continue
+        db.session.add(Agendamento(
+            canal=linha['canal'], categoria=linha['categoria'], status=linha['status'],
+            setor=linha['setor'], coordenador=linha['coordenador'],
+            nome_responsavel_1=linha['nome_responsavel_1'], nome_responsavel_2=linha['nome_responsavel_2'],
+            cpf_responsavel_1=linha['cpf_responsavel_1'], cpf_responsavel_2=linha['cpf_responsavel_2'],
+            aluno=linha['aluno'], escolaAluno=linha['escolaAluno'], motivo=linha['motivo'],
+            data_agendamento=data_agendamento,
+            horario=horario,
+        ))
+        db.session.commit()
+    return Agendamento.query.count()
+
+
+def em_lote(df):
+    resultado = importar(db.session, df, ignorar_erros=True)
+    return resultado.importados
+
+
+def medir(funcao, df, tmp, nome):
+    app = criar_app(os.path.join(tmp, f'{nome}.db'))
+    with app.app_context():
+        db.create_all()
+        cadastrar_referencias(db.session)
+        inicio = timer.perf_counter()
+        gravados = funcao(df)
+        tempo = timer.perf_counter() - inicio
+        divergencias = len(verificar_estatisticas(db.session))
+    return tempo, gravados, divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=20000)
+    args = parser.parse_args()
+
+    df = planilha(args.linhas)
+    print(f"{'Caminho':15} {'tempo (s)':>10} {'linhas/s':>10} {'gravados':>9} {'estatísticas':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for nome, funcao in (('um por vez', um_por_vez), ('em lote', em_lote)):
+            tempo, gravados, divergencias = medir(funcao, df, tmp, nome.replace(' ', '_'))
+            situacao = 'ok' if not divergencias else f'{divergencias} erros'
+            print(f'{nome:15} {tempo:10.2f} {len(df) / tempo:10.0f} {gravados:9} {situacao:>13}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Compara planos de consulta e tempos das consultas do dashboard com e sem índices.
+
+Uso:
+    python benchmarks/bench_indices.py --linhas 200000
+
+Cria um banco SQLite temporário (não toca em instance/bancoAgendamentos.db),
+popula com agendamentos sintéticos e executa as consultas usadas em app.py.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time as timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, Agendamento
+from dados import criar_app, popular
+
+# Mesmos formatos de consulta de app.py, com os valores no formato gravado pelo SQLAlchemy.
+# Parâmetros (coluna, nome) são trocados pelo id correspondente e None pela data de exemplo.
+CONSULTAS = [
+    ('Dashboard admin (1ª página)',
+     "SELECT * FROM agendamento ORDER BY data_agendamento DESC, horario DESC, id DESC LIMIT 51", ()),
+    ('Dashboard coordenação',
+     "SELECT * FROM agendamento WHERE coordenador_id = ? "
+     "ORDER BY data_agendamento DESC, horario DESC, id DESC LIMIT 51", (('coordenador', 'coord07'),)),
+    ('Dashboard financeiro',
+     "SELECT * FROM agendamento WHERE status_id IN (?, ?, ?) "
+     "ORDER BY data_agendamento DESC, horario DESC, id DESC LIMIT 51",
+     (('status', 'Apto-Financeiro'), ('status', 'Não-Apto-Financeiro'), ('status', 'Apto-Coordenação'))),
+    ('Filtro por status',
+     "SELECT * FROM agendamento WHERE status_id = ? "
+     "ORDER BY data_agendamento DESC, horario DESC, id DESC LIMIT 51", (('status', 'Aberto-Coordenação'),)),
+    ('Filtro por setor',
+     "SELECT * FROM agendamento WHERE setor_id = ? "
+     "ORDER BY data_agendamento DESC, horario DESC, id DESC LIMIT 51", (('setor', 'Comercial'),)),
+    ('Filtro por data',
+     "SELECT * FROM agendamento WHERE data_agendamento = ? "
+     "ORDER BY data_agendamento DESC, horario DESC, id DESC LIMIT 51", (None,)),
+    ('Busca por CPF',
+     "SELECT * FROM agendamento WHERE cpf_responsavel_1 = ? OR cpf_responsavel_2 = ? "
+     "ORDER BY data_agendamento DESC, horario DESC, id DESC LIMIT 51", ('12345678901', '12345678901')),
+    ('Conflito de horário',
+     "SELECT * FROM agendamento WHERE data_agendamento = ? AND horario = ? AND coordenador_id = ? LIMIT 1",
+     (None, '10:00:00.000000', ('coordenador', 'coord07'))),
+]
+
+
+def medir(conn, sql, params, repeticoes):
+    plano = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql, params)]
+    inicio = timer.perf_counter()
+    for _ in range(repeticoes):
+        conn.exec_driver_sql(sql, params).fetchall()
+    return plano, (timer.perf_counter() - inicio) / repeticoes * 1000
+
+
+def parametro(valor, data_exemplo, ids):
+    if valor is None:
+        return data_exemplo
+    if isinstance(valor, tuple):
+        coluna, nome = valor
+        return ids[coluna][nome]
+    return valor
+
+
+def executar(conn, data_exemplo, ids, repeticoes):
+    resultados = {}
+    for nome, sql, params in CONSULTAS:
+        params = tuple(parametro(p, data_exemplo, ids) for p in params)
+        resultados[nome] = medir(conn, sql, params, repeticoes)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=200000)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = criar_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            indices = list(Agendamento.__table__.indexes)
+            for index in indices:
+                index.drop(bind=db.engine)
+
+            print(f'Populando {args.linhas} agendamentos...')
+            ids = popular(db.session, Agendamento.__table__, args.linhas)
+            data_exemplo = db.session.query(Agendamento.data_agendamento).first()[0].isoformat()
+
+            with db.engine.connect() as conn:
+                antes = executar(conn, data_exemplo, ids, args.repeticoes)
+
+            for index in indices:
+                index.create(bind=db.engine)
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql('ANALYZE')
+
+            with db.engine.connect() as conn:
+                depois = executar(conn, data_exemplo, ids, args.repeticoes)
+
+    for nome, _, _ in CONSULTAS:
+        plano_antes, ms_antes = antes[nome]
+        plano_depois, ms_depois = depois[nome]
+        print(f'\n== {nome}')
+        print(f'   sem índices: {ms_antes:8.2f} ms  | ' + ' / '.join(plano_antes))
+        print(f'   com índices: {ms_depois:8.2f} ms  | ' + ' / '.join(plano_depois))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Custo das páginas do dashboard conforme a profundidade (paginação por cursor).
+
+Uso:
+    python benchmarks/bench_paginacao.py --agendamentos 50000
+
+Cria um banco temporário com `popular_banco`, percorre a listagem do
+dashboard com `keyset_paginate` e mede a primeira página, páginas no meio e
+as últimas, nos dois sentidos (depois/antes). Termina com erro se o plano de
+execução não usar o cursor como limite da busca no índice
+ix_agendamento_data_horario ou se uma página profunda custar bem mais que a
+primeira.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time as timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from popular_banco import popular_banco
+
+# Uma página profunda pode custar até FATOR_MAXIMO vezes a primeira (mais uma folga fixa)
+FATOR_MAXIMO = 3
+FOLGA_MS = 1.0
+
+
+def medir(funcao, repeticoes):
+    funcao()
+    inicio = timer.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (timer.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agendamentos', type=int, default=50000)
+    parser.add_argument('--por-pagina', type=int, default=50)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench_paginacao_')
+    # Antes de importar o app, que lê DATABASE_URL na inicialização
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'paginacao.db')}"
+    from app import app, keyset_paginate, encode_cursor
+    from models import db, Agendamento
+
+    try:
+        print(f'Populando banco temporário com {args.agendamentos} agendamentos...')
+        popular_banco(app, args.agendamentos)
+
+        with app.app_context():
+            # Cursores de cada página, do início ao fim da listagem
+            ordenados = db.session.query(Agendamento.data_agendamento, Agendamento.horario, Agendamento.id).order_by(
+                Agendamento.data_agendamento.desc(), Agendamento.horario.desc(), Agendamento.id.desc()
+            ).all()
+            cursores = [encode_cursor(linha) for linha in ordenados[args.por_pagina - 1::args.por_pagina]]
+            paginas = len(cursores)
+            profundidades = sorted({0, paginas // 4, paginas // 2, paginas * 3 // 4, paginas - 2})
+
+            def pagina(**cursor):
+                keyset_paginate(Agendamento.query, page_size=args.por_pagina, **cursor)
+                db.session.expunge_all()
+
+            falhas = []
+            plano = plano_da_pagina(db, lambda: pagina(depois=cursores[paginas // 2]))
+            print('Plano da página seguinte ao cursor:\n  ' + '\n  '.join(plano))
+            if not any('ix_agendamento_data_horario' in linha and '<' in linha for linha in plano):
+                falhas.append('o cursor não é usado como limite da busca no índice')
+
+            primeira = medir(lambda: pagina(), args.repeticoes)
+            print(f"{'página':>8} {'depois ms':>10} {'antes ms':>10}")
+            print(f"{1:8} {primeira:10.2f} {'-':>10}")
+            for profundidade in profundidades[1:]:
+                depois = medir(lambda: pagina(depois=cursores[profundidade]), args.repeticoes)
+                antes = medir(lambda: pagina(antes=cursores[profundidade]), args.repeticoes)
+                print(f'{profundidade + 2:8} {depois:10.2f} {antes:10.2f}')
+                limite = primeira * FATOR_MAXIMO + FOLGA_MS
+                if max(depois, antes) > limite:
+                    falhas.append(f'página {profundidade + 2}: {max(depois, antes):.2f} ms (limite {limite:.2f} ms)')
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if falhas:
+        sys.exit('Falhou: ' + '; '.join(falhas))
+    print('OK: o custo da página não depende da profundidade.')
+
+
+def plano_da_pagina(db, consultar):
+    """Plano (EXPLAIN QUERY PLAN) do SELECT executado por `consultar`."""
+    from sqlalchemy import event
+
+    executadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        executadas.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        consultar()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+    statement, parameters = executadas[-1]
+    linhas = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+    return [linha[-1] for linha in linhas]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Memória e tempo da geração do PDF em blocos (write_pdf_chunked).
+
+Uso:
+    python benchmarks/bench_pdf.py --linhas 2000,8000 --bloco 500
+
+Para cada quantidade de linhas gera um PDF com uma tabela sintética no
+formato do relatório, pela mesma função usada na fila de relatórios, e
+informa tempo, páginas, tamanho do arquivo e pico de memória alocada
+(tracemalloc). Durante a geração verifica que o documento diagramado de um
+bloco já foi liberado quando o bloco seguinte começa a ser diagramado;
+termina com erro caso contrário, porque então o pico de memória volta a
+crescer com o tamanho do relatório.
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time as timer
+import tracemalloc
+import weakref
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reports import write_pdf_chunked
+
+
+def render_html(bloco, primeiro, ultimo, pagina_inicial, total):
+    linhas = ''.join(
+        f'<tr><td>{numero}</td><td>Responsável {numero}</td><td>Aluno {numero}</td><td>Matrícula</td></tr>'
+        for numero in bloco
+    )
+    cabecalho = '<h1>Relatório de Agendamentos</h1>' if primeiro else ''
+    rodape = f'<p>Total de registros: {total}</p>' if ultimo else ''
+    estilo = f'@page {{ counter-reset: page {pagina_inicial}; }}'
+    return f'<html><head><style>{estilo}</style></head><body>{cabecalho}<table>{linhas}</table>{rodape}</body></html>'
+
+
+def monitorar_documentos():
+    """Envolve HTML.render para registrar documentos do bloco anterior ainda vivos."""
+    from weasyprint import HTML
+
+    original = HTML.render
+    documentos = []
+    vazamentos = []
+
+    def render(self, *args, **kwargs):
+        gc.collect()
+        vazamentos.extend(ref for ref in documentos if ref() is not None)
+        documentos.clear()
+        documento = original(self, *args, **kwargs)
+        documentos.append(weakref.ref(documento))
+        return documento
+
+    HTML.render = render
+    return vazamentos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--linhas', default='2000,8000', help='Quantidades de linhas, separadas por vírgula.')
+    parser.add_argument('--bloco', type=int, default=500)
+    args = parser.parse_args()
+
+    vazamentos = monitorar_documentos()
+    print(f"{'linhas':>8} {'tempo s':>8} {'páginas':>8} {'arquivo KB':>11} {'pico MB':>8}")
+    with tempfile.TemporaryDirectory(prefix='bench_pdf_') as tmp:
+        for linhas in map(int, args.linhas.split(',')):
+            caminho = os.path.join(tmp, f'{linhas}.pdf')
+            tracemalloc.start()
+            inicio = timer.perf_counter()
+            paginas = write_pdf_chunked(range(1, linhas + 1), render_html, caminho, chunk_size=args.bloco)
+            duracao = timer.perf_counter() - inicio
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'{linhas:8} {duracao:8.2f} {paginas:8} {os.path.getsize(caminho) / 1024:11.0f} '
+                  f'{pico / 1024 / 1024:8.1f}')
+
+    if vazamentos:
+        sys.exit(f'Falhou: {len(vazamentos)} documento(s) diagramado(s) continuavam em memória no bloco seguinte.')
+    print('OK: cada bloco é liberado antes do seguinte.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Leituras e gravações simultâneas no SQLite: configuração padrão x ajustada.
+
+Uso:
+    python benchmarks/bench_sqlite.py --agendamentos 50000 --leitores 8 --escritores 2 --segundos 10
+    python benchmarks/bench_sqlite.py --banco /tmp/carga.db
+
+Sem --banco, cria um banco temporário com `popular_banco`. Para cada modo,
+threads leitoras repetem a consulta do dashboard (página de agendamentos e
+contagem por status) enquanto threads escritoras fazem checkouts (troca de
+status pelo ORM, com as estatísticas, a versão dos dados e o índice de busca
+atualizados como no app), durante o mesmo tempo:
+
+- padrao: como o app era configurado antes (journal em rollback, NullPool e o
+  timeout padrão do driver);
+- ajustado: opções e pragmas do `banco.py` com a configuração do app (WAL,
+  synchronous NORMAL, cache, mmap, busy_timeout e QueuePool).
+
+Informa operações por segundo, percentis de latência e quantas operações
+falharam com "database is locked".
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time as timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from popular_banco import popular_banco
+
+
+def percentil(valores, fracao):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, round(fracao * (len(ordenados) - 1)))]
+
+
+def criar_engine(url, modo, config):
+    from sqlalchemy import create_engine, event
+    from banco import configurar_engine, opcoes_engine
+
+    if modo == 'ajustado':
+        engine = create_engine(url, **opcoes_engine({**config, 'SQLALCHEMY_DATABASE_URI': url}))
+        configurar_engine(engine, config)
+        return engine
+
+    engine = create_engine(url)
+
+    @event.listens_for(engine, 'connect')
+    def journal_padrao(dbapi_connection, connection_record):
+        # O modo WAL fica gravado no arquivo: volta ao journal padrão do SQLite
+        dbapi_connection.execute('PRAGMA journal_mode = DELETE')
+
+    return engine
+
+
+def executar(engine, leitores, escritores, segundos, ids, status_ids):
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import Session
+    from models import Agendamento
+
+    resultados = {'leitura': [], 'gravacao': []}
+    bloqueios = {'leitura': 0, 'gravacao': 0}
+    lock = threading.Lock()
+    fim = timer.perf_counter() + segundos
+
+    def ler(session, _):
+        session.query(Agendamento).order_by(
+            Agendamento.data_agendamento.desc(), Agendamento.horario.desc(), Agendamento.id.desc()
+        ).limit(50).all()
+        session.query(Agendamento.status_id, Agendamento.id).filter(
+            Agendamento.status_id.in_(status_ids)
+        ).count()
+
+    def gravar(session, rnd):
+        agendamento = session.get(Agendamento, rnd.choice(ids))
+        agendamento.status_id = rnd.choice(status_ids)
+        session.commit()
+
+    def trabalhador(tipo, operacao, seed):
+        rnd = random.Random(seed)
+        tempos, falhas = [], 0
+        while timer.perf_counter() < fim:
+            session = Session(engine)
+            inicio = timer.perf_counter()
+            try:
+                operacao(session, rnd)
+                tempos.append((timer.perf_counter() - inicio) * 1000)
+            except OperationalError as e:
+                if 'locked' not in str(e.orig):
+                    raise
+                falhas += 1
+            finally:
+                session.rollback()
+                session.close()
+        with lock:
+            resultados[tipo].extend(tempos)
+            bloqueios[tipo] += falhas
+
+    threads = [threading.Thread(target=trabalhador, args=('leitura', ler, i)) for i in range(leitores)]
+    threads += [threading.Thread(target=trabalhador, args=('gravacao', gravar, 1000 + i)) for i in range(escritores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        tipo: {
+            'por_segundo': len(tempos) / segundos,
+            'p50': percentil(tempos, 0.50),
+            'p95': percentil(tempos, 0.95),
+            'p99': percentil(tempos, 0.99),
+            'bloqueios': bloqueios[tipo],
+        }
+        for tipo, tempos in resultados.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--banco', help='Banco SQLite já populado por popular_banco.py (é alterado pelos checkouts).')
+    parser.add_argument('--agendamentos', type=int, default=50000, help='Tamanho do banco temporário (sem --banco).')
+    parser.add_argument('--leitores', type=int, default=8)
+    parser.add_argument('--escritores', type=int, default=2)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--modos', default='padrao,ajustado')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench_sqlite_')
+    caminho = os.path.abspath(args.banco) if args.banco else os.path.join(tmp, 'sqlite.db')
+    url = f'sqlite:///{caminho}'
+    # Antes de importar o app, que lê DATABASE_URL na inicialização
+    os.environ['DATABASE_URL'] = url
+    from app import app
+    from models import db, Agendamento, Status, GRUPO_ABERTO
+
+    try:
+        with app.app_context():
+            if not args.banco:
+                print(f'Populando banco temporário com {args.agendamentos} agendamentos...')
+                popular_banco(app, args.agendamentos)
+            ids = [id_ for id_, in db.session.query(Agendamento.id)]
+            status_ids = [s.id for s in Status.query.filter_by(grupo_admin=GRUPO_ABERTO)]
+            db.session.remove()
+            db.engine.dispose()
+
+        print(f'{len(ids)} agendamentos, {args.leitores} leitores, {args.escritores} escritores, {args.segundos:g} s')
+        print(f"{'modo':10} {'operação':9} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'locked':>7}")
+        for modo in args.modos.split(','):
+            engine = criar_engine(url, modo, app.config)
+            try:
+                resultado = executar(engine, args.leitores, args.escritores, args.segundos, ids, status_ids)
+            finally:
+                engine.dispose()
+            for tipo, r in resultado.items():
+                print(f"{modo:10} {tipo:9} {r['por_segundo']:9.1f} {r['p50']:9.1f} {r['p95']:9.1f} "
+                      f"{r['p99']:9.1f} {r['bloqueios']:7}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Cria agendamentos simultâneos nos mesmos horários e verifica que nenhum foi duplicado.
+
+Uso:
+    python benchmarks/concorrencia_agendamentos.py --threads 16 --tentativas 100
+
+Várias threads, cada uma com a sua sessão de administrador, enviam o
+formulário de novo agendamento (POST /agendamento/novo) disputando poucos
+horários do mesmo coordenador num banco SQLite temporário. Ao final cada
+horário disputado deve ter exatamente um agendamento e as estatísticas devem
+bater com a tabela; caso contrário o script termina com erro.
+
+Com --sem-indice o índice único de horário é removido antes da disputa, para
+reproduzir as reservas duplicadas que ele impede.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time as timer
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COORDENADOR = 'user'
+
+
+def formulario(referencias, dia, horario, numero):
+    return {
+        'data_agendamento': dia.isoformat(),
+        'horario': horario,
+        'coordenador': COORDENADOR,
+        'nome_responsavel_1': f'Responsável {numero}',
+        'nome_responsavel_2': f'Responsável {numero} B',
+        'cpf_responsavel_1': '123.456.789-01',
+        'cpf_responsavel_2': '123.456.789-02',
+        'motivo': 'Teste de concorrência',
+        **referencias,
+    }
+
+
+def disputar(app, referencias, threads, tentativas, horarios, dia):
+    """Cada thread percorre os horários a partir de um ponto diferente; retorna a contagem das respostas."""
+    barreira = threading.Barrier(threads)
+    trava = threading.Lock()
+    respostas = Counter()
+
+    def trabalhador(numero):
+        cliente = app.test_client()
+        cliente.post('/login', data={'username': 'admin', 'password': 'admin'})
+        locais = Counter()
+        barreira.wait()
+        for tentativa in range(tentativas):
+            horario = horarios[(numero + tentativa) % len(horarios)]
+            resposta = cliente.post('/agendamento/novo',
+                                    data=formulario(referencias, dia, horario, numero * tentativas + tentativa))
+            if resposta.status_code == 302:
+                locais['criados'] += 1
+            elif 'já possui um agendamento' in resposta.get_data(as_text=True):
+                locais['conflitos'] += 1
+            else:
+                locais[f'HTTP {resposta.status_code}'] += 1
+        with trava:
+            respostas.update(locais)
+
+    grupo = [threading.Thread(target=trabalhador, args=(numero,)) for numero in range(threads)]
+    for thread in grupo:
+        thread.start()
+    for thread in grupo:
+        thread.join()
+    return respostas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--tentativas', type=int, default=50, help='Envios do formulário por thread.')
+    parser.add_argument('--horarios', type=int, default=4, help='Quantidade de horários disputados.')
+    parser.add_argument('--sem-indice', action='store_true', help='Remove o índice único antes da disputa.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Antes de importar o app, que lê DATABASE_URL na inicialização
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'concorrencia.db')}"
+        from app import app
+        from models import (db, Agendamento, Canal, Categoria, Setor, Status,
+                            INDICE_HORARIO_COORDENADOR, horarios_duplicados, verificar_estatisticas)
+
+        resultado = app.test_cli_runner().invoke(args=['init-db'])
+        if resultado.exit_code:
+            sys.exit(resultado.output)
+
+        with app.app_context():
+            referencias = {
+                'canal': Canal.query.first().nome,
+                'categoria': Categoria.query.first().nome,
+                'status': Status.query.first().nome,
+                'setor': Setor.query.first().nome,
+            }
+            if args.sem_indice:
+                with db.engine.begin() as conn:
+                    conn.exec_driver_sql(f'DROP INDEX {INDICE_HORARIO_COORDENADOR}')
+
+        dia = date.today() + timedelta(days=7)
+        horarios = [f'{8 + i // 2:02d}:{30 * (i % 2):02d}' for i in range(args.horarios)]
+
+        inicio = timer.perf_counter()
+        respostas = disputar(app, referencias, args.threads, args.tentativas, horarios, dia)
+        tempo = timer.perf_counter() - inicio
+
+        with app.app_context():
+            gravados = Agendamento.query.count()
+            with db.engine.connect() as conn:
+                duplicados = horarios_duplicados(conn)
+            divergencias = verificar_estatisticas(db.session)
+            db.engine.dispose()
+
+    envios = args.threads * args.tentativas
+    print(f'{envios} envios em {tempo:.2f} s ({envios / tempo:.0f}/s) por {args.threads} threads')
+    for chave, quantidade in sorted(respostas.items()):
+        print(f'  {chave:12} {quantidade:6}')
+    print(f'Agendamentos gravados: {gravados} (horários disputados: {len(horarios)})')
+    print(f'Horários com reserva duplicada: {len(duplicados)}')
+    print(f'Divergências nas estatísticas: {len(divergencias)}')
+
+    if duplicados or divergencias or gravados != len(horarios) or respostas['criados'] != gravados:
+        sys.exit('FALHOU')
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""Gerador de agendamentos sintéticos para os benchmarks."""
+import random
+from itertools import accumulate
+from datetime import date, time, timedelta
+
+from flask import Flask
+
+from models import db, Canal, Setor, Categoria, Status, User
+
+CANAIS = ['Telefone', 'Email', 'Presencial', 'WhatsApp']
+PESOS_CANAL = [30, 15, 20, 35]
+SETORES = ['Comercial', 'Acadêmico', 'Financeiro', 'Fund. Anos Iniciais', 'Fund. Anos Finais', 'Ensino Médio']
+CATEGORIAS = ['Matrícula', 'Bolsa', 'Cancelamento', 'Intervenção Psicologia', 'Agendamento Coordenação']
+PESOS_CATEGORIA = [45, 15, 8, 7, 25]
+STATUSES = [
+    'Aberto-Coordenação',
+    'Em andamento-Coordenação',
+    'Remarcado-Coordenação',
+    'Apto-Coordenação',
+    'Não-Apto-Coordenação',
+    'Apto-Financeiro',
+    'Não-Apto-Financeiro',
+    'Concluído-Secretaria',
+]
+# Distribuição aproximada: a maior parte do histórico já está concluída
+PESOS_STATUS = [8, 4, 2, 10, 4, 15, 5, 52]
+# Agendamentos futuros ainda estão com a coordenação
+STATUSES_FUTUROS = STATUSES[:3]
+PESOS_STATUS_FUTUROS = [70, 10, 20]
+# Status em que o agendamento já foi enviado ao setor Financeiro
+STATUSES_FINANCEIRO = {'Apto-Coordenação', 'Apto-Financeiro', 'Não-Apto-Financeiro'}
+SETORES_COORDENACAO = [setor for setor in SETORES if setor != 'Financeiro']
+PESOS_SETOR = [35, 10, 20, 20, 15]
+
+NOMES = [
+    'Ana', 'Maria', 'Juliana', 'Fernanda', 'Patrícia', 'Aline', 'Camila', 'Amanda', 'Bruna', 'Letícia',
+    'Beatriz', 'Larissa', 'Gabriela', 'Mariana', 'Vanessa', 'Luciana', 'Cláudia', 'Renata', 'Helena', 'Sofia',
+    'José', 'João', 'Antônio', 'Francisco', 'Carlos', 'Paulo', 'Pedro', 'Lucas', 'Luiz', 'Marcos',
+    'Rafael', 'Gabriel', 'Daniel', 'Marcelo', 'Bruno', 'Eduardo', 'Felipe', 'Rodrigo', 'Gustavo', 'Miguel',
+]
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+    'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes', 'Marques', 'Machado', 'Mendes', 'Freitas',
+]
+ESCOLAS = [
+    'Colégio Panorama', 'Escola Estadual Machado de Assis', 'Colégio São José',
+    'Escola Municipal Monteiro Lobato', 'Colégio Objetivo', 'Escola Adventista',
+]
+MOTIVOS = [
+    'Primeira reunião de matrícula', 'Renovação de matrícula', 'Solicitação de bolsa',
+    'Revisão de desconto', 'Pedido de cancelamento', 'Acompanhamento pedagógico',
+    'Conversa com a coordenação', 'Transferência de turma',
+]
+# Horários de atendimento (07:00 a 18:30)
+HORARIOS = [time(h, m) for h in range(7, 19) for m in (0, 30)]
+# Parte da agenda que o gerador pode ocupar antes de pedir mais coordenadores
+OCUPACAO_MAXIMA = 0.8
+
+
+def gerar_cpf(rnd):
+    """CPF válido (com os dígitos verificadores), só os números como o app grava."""
+    cpf = f'{rnd.randrange(10 ** 9):09d}'
+    for tamanho in (9, 10):
+        soma = sum(int(d) * peso for d, peso in zip(cpf, range(tamanho + 1, 1, -1)))
+        cpf += str(soma * 10 % 11 % 10)
+    return cpf
+
+
+def dias_uteis(anos):
+    """Dias de segunda a sexta de `anos` atrás até 60 dias à frente."""
+    inicio = date.today() - timedelta(days=365 * anos)
+    todos = (inicio + timedelta(days=n) for n in range(365 * anos + 60))
+    return [dia for dia in todos if dia.weekday() < 5]
+
+
+def coordenadores_para(quantidade, anos=3, minimo=20):
+    """Quantidade de coordenadores para que as agendas fiquem até a metade ocupadas."""
+    capacidade = len(dias_uteis(anos)) * len(HORARIOS)
+    return max(minimo, -(-quantidade * 2 // capacidade))
+
+
+def gerar_agendamentos(quantidade, coordenadores=20, anos=3, seed=42):
+    """Gera `quantidade` dicionários prontos para inserção na tabela agendamento.
+
+    Os agendamentos caem em dias úteis e no horário de atendimento, sem dois
+    do mesmo coordenador no mesmo horário. Alguns coordenadores atendem bem
+    mais que outros; agendamentos futuros estão abertos e os enviados ao
+    Financeiro estão no setor Financeiro, como o app faz.
+    """
+    rnd = random.Random(seed)
+    nomes_coordenadores = [f'coord{i:02d}' for i in range(coordenadores)]
+    # Pesos acumulados: `choices` não precisa somá-los a cada agendamento
+    pesos_coordenadores = list(accumulate(1 / (i + 1) ** 0.5 for i in range(coordenadores)))
+    pesos = {nome: list(accumulate(valores)) for nome, valores in (
+        ('canal', PESOS_CANAL), ('categoria', PESOS_CATEGORIA), ('setor', PESOS_SETOR),
+        ('status', PESOS_STATUS), ('status_futuro', PESOS_STATUS_FUTUROS))}
+    coordenadores_ids = range(coordenadores)
+    dias = dias_uteis(anos)
+    hoje = date.today()
+
+    capacidade = coordenadores * len(dias) * len(HORARIOS)
+    if quantidade > capacidade * OCUPACAO_MAXIMA:
+        raise ValueError(f'{quantidade} agendamentos não cabem na agenda de {coordenadores} coordenadores; '
+                         f'use pelo menos {coordenadores_para(quantidade, anos)}.')
+
+    ocupados = set()
+    for i in range(quantidade):
+        coordenador = rnd.choices(coordenadores_ids, cum_weights=pesos_coordenadores)[0]
+        while True:
+            dia, horario = rnd.randrange(len(dias)), rnd.randrange(len(HORARIOS))
+            chave = (coordenador * len(dias) + dia) * len(HORARIOS) + horario
+            if chave not in ocupados:
+                break
+            # Horário já ocupado: tenta outro coordenador (os mais procurados lotam)
+            coordenador = rnd.randrange(coordenadores)
+        ocupados.add(chave)
+
+        data_agendamento = dias[dia]
+        if data_agendamento >= hoje:
+            status = rnd.choices(STATUSES_FUTUROS, cum_weights=pesos['status_futuro'])[0]
+        else:
+            status = rnd.choices(STATUSES, cum_weights=pesos['status'])[0]
+        if status in STATUSES_FINANCEIRO:
+            setor = 'Financeiro'
+        else:
+            setor = rnd.choices(SETORES_COORDENACAO, cum_weights=pesos['setor'])[0]
+
+        familia = f'{rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}'
+        yield {
+            'canal': rnd.choices(CANAIS, cum_weights=pesos['canal'])[0],
+            'nome_responsavel_1': f'{rnd.choice(NOMES)} {familia}',
+            'nome_responsavel_2': f'{rnd.choice(NOMES)} {familia}',
+            'cpf_responsavel_1': gerar_cpf(rnd),
+            'cpf_responsavel_2': gerar_cpf(rnd),
+            'categoria': rnd.choices(CATEGORIAS, cum_weights=pesos['categoria'])[0],
+            'status': status,
+            'setor': setor,
+            'aluno': f'{rnd.choice(NOMES)} {familia}',
+            'escolaAluno': rnd.choice(ESCOLAS),
+            'motivo': rnd.choice(MOTIVOS),
+            'data_agendamento': data_agendamento,
+            'horario': HORARIOS[horario],
+            'coordenador': nomes_coordenadores[coordenador],
+            'observacao': 'Responsável pediu retorno por telefone' if rnd.random() < 0.1 else None,
+        }
+
+
+def cadastrar_referencias(session, coordenadores=20):
+    """Cadastra canais, setores, categorias, status e coordenadores usados pelo gerador.
+
+    Retorna, para cada coluna de agendamento, o mapa nome -> id.
+    """
+    modelos = {
+        'canal': (Canal, CANAIS),
+        'setor': (Setor, SETORES),
+        'categoria': (Categoria, CATEGORIAS),
+        'status': (Status, STATUSES),
+    }
+    ids = {}
+    for coluna, (model, nomes) in modelos.items():
+        existentes = {item.nome: item for item in model.query.filter(model.nome.in_(nomes))}
+        novos = [model(nome=nome) for nome in nomes if nome not in existentes]
+        session.add_all(novos)
+        session.flush()
+        ids[coluna] = {item.nome: item.id for item in list(existentes.values()) + novos}
+
+    nomes = [f'coord{i:02d}' for i in range(coordenadores)]
+    existentes = {u.username: u for u in User.query.filter(User.username.in_(nomes))}
+    novos = [User(username=nome, email=f'{nome}@example.com', perfil='user')
+             for nome in nomes if nome not in existentes]
+    session.add_all(novos)
+    session.flush()
+    ids['coordenador'] = {u.username: u.id for u in list(existentes.values()) + novos}
+    session.commit()
+    return ids
+
+
+def popular(session, table, quantidade, lote=5000, coordenadores=20, **kwargs):
+    """Insere os agendamentos gerados em lotes (executemany).
+
+    Os nomes gerados são trocados pelos ids das tabelas de referência, que são
+    cadastradas antes. Retorna o mapa nome -> id de `cadastrar_referencias`.
+    """
+    ids = cadastrar_referencias(session, coordenadores)
+
+    def linha(row):
+        for coluna, por_nome in ids.items():
+            row[f'{coluna}_id'] = por_nome[row.pop(coluna)]
+        return row
+
+    lote_atual = []
+    for row in gerar_agendamentos(quantidade, coordenadores=coordenadores, **kwargs):
+        lote_atual.append(linha(row))
+        if len(lote_atual) >= lote:
+            session.execute(table.insert(), lote_atual)
+            lote_atual = []
+    if lote_atual:
+        session.execute(table.insert(), lote_atual)
+    session.commit()
+    return ids
+
+
+def criar_app(caminho):
+    """App Flask mínimo (só os modelos) apontando para um banco SQLite de benchmark."""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{caminho}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
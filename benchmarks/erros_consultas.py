@@ -0,0 +1,100 @@
+"""Verifica que consultas com erro não deixam resíduos na instrumentação de SQL.
+
+Uso:
+    python benchmarks/erros_consultas.py --conflitos 20
+
+Num banco SQLite temporário, envia repetidamente o mesmo agendamento
+(POST /agendamento/novo): a partir do segundo envio o INSERT falha com
+IntegrityError no índice único de horário do coordenador. Também grava um
+status com nome repetido fora de requisições. A cada devolução de conexão ao
+pool confere que a pilha de inícios de consulta (conn.info['inicio_consulta'])
+está vazia, e que as consultas com erro entram na contagem da requisição
+(X-SQL-Queries); termina com erro caso contrário.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concorrencia_agendamentos import formulario
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--conflitos', type=int, default=20, help='Envios repetidos do mesmo agendamento.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Antes de importar o app, que lê DATABASE_URL na inicialização
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'erros.db')}"
+        from sqlalchemy import event
+        from sqlalchemy.exc import IntegrityError
+        from app import app
+        from models import db, Canal, Categoria, Setor, Status
+
+        app.config['SQL_DEBUG_HEADERS'] = True
+        resultado = app.test_cli_runner().invoke(args=['init-db'])
+        if resultado.exit_code:
+            sys.exit(resultado.output)
+
+        falhas = []
+        with app.app_context():
+            referencias = {
+                'canal': Canal.query.first().nome,
+                'categoria': Categoria.query.first().nome,
+                'status': Status.query.first().nome,
+                'setor': Setor.query.first().nome,
+            }
+
+            # Pilhas com inícios pendentes encontradas ao devolver conexões ao pool
+            residuos = []
+
+            def conferir(dbapi_connection, connection_record):
+                if connection_record.info.get('inicio_consulta'):
+                    residuos.append(list(connection_record.info['inicio_consulta']))
+
+            event.listen(db.engine, 'checkin', conferir)
+
+            # Consultas enviadas ao banco, inclusive as que falham
+            executadas = []
+            event.listen(db.engine, 'before_cursor_execute', lambda *args: executadas.append(args[2]))
+
+        cliente = app.test_client()
+        cliente.post('/login', data={'username': 'admin', 'password': 'admin'})
+        dados = formulario(referencias, date.today() + timedelta(days=7), '09:00', 1)
+        divergentes = 0
+        for _ in range(args.conflitos + 1):
+            executadas.clear()
+            resposta = cliente.post('/agendamento/novo', data=dados)
+            if int(resposta.headers['X-SQL-Queries']) != len(executadas):
+                divergentes += 1
+        if divergentes:
+            falhas.append(f'{divergentes} requisição(ões) com X-SQL-Queries diferente das consultas executadas')
+
+        with app.app_context():
+            try:
+                db.session.add(Status(nome=referencias['status']))
+                db.session.commit()
+                falhas.append('o status repetido não gerou IntegrityError')
+            except IntegrityError:
+                db.session.rollback()
+            db.session.remove()
+            with db.engine.connect() as conn:
+                pendentes = conn.info.get('inicio_consulta', [])
+                if pendentes:
+                    residuos.append(list(pendentes))
+            db.engine.dispose()
+
+    print(f'Conflitos enviados: {args.conflitos}; conexões devolvidas com inícios pendentes: {len(residuos)}')
+    if residuos:
+        falhas.append(f'{len(residuos)} conexão(ões) com a pilha de inícios de consulta não vazia')
+    if falhas:
+        sys.exit('Falhou: ' + '; '.join(falhas))
+    print('OK: consultas com erro são contadas e não deixam inícios pendentes.')
+
+
+if __name__ == '__main__':
+    main()
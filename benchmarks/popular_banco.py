@@ -0,0 +1,80 @@
+"""Popula o banco do app com agendamentos sintéticos para testes de carga.
+
+Uso:
+    python benchmarks/popular_banco.py --agendamentos 100000
+    python benchmarks/popular_banco.py --agendamentos 1000000 --banco /tmp/carga.db
+
+Cria o banco como o `flask init-db` (usuários admin, user e financeiro e as
+configurações padrão), insere os agendamentos em lote e deixa estatísticas,
+índice de busca e estatísticas do planejador prontos. Os coordenadores são
+coord00, coord01, ...; o `COORDENADOR_CARGA` pode entrar no app com a senha
+igual ao nome, para os testes do perfil de coordenação.
+
+Por padrão usa o banco do app (instance/bancoAgendamentos.db), que precisa
+estar vazio.
+"""
+import argparse
+import os
+import sys
+import time as timer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dados import coordenadores_para, popular
+
+# Coordenador com mais agendamentos no gerador
+COORDENADOR_CARGA = 'coord00'
+
+
+def popular_banco(app, quantidade, coordenadores=None, seed=42):
+    """Inicializa o banco do `app` e insere `quantidade` agendamentos sintéticos."""
+    from models import db, Agendamento, User, incrementar_versao, reconstruir_estatisticas
+
+    resultado = app.test_cli_runner().invoke(args=['init-db'])
+    if resultado.exit_code:
+        raise RuntimeError(resultado.output)
+
+    with app.app_context():
+        if Agendamento.query.first():
+            raise ValueError('O banco já tem agendamentos; use um banco vazio (--banco).')
+
+        popular(db.session, Agendamento.__table__, quantidade,
+                coordenadores=coordenadores or coordenadores_para(quantidade), seed=seed)
+
+        usuario = User.query.filter_by(username=COORDENADOR_CARGA).one()
+        usuario.set_password(COORDENADOR_CARGA)
+        # O INSERT em lote não passa pelos eventos do ORM
+        incrementar_versao(db.session.connection())
+        reconstruir_estatisticas(db.session)
+
+        if db.engine.dialect.name == 'sqlite':
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql('ANALYZE')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agendamentos', type=int, default=100000)
+    parser.add_argument('--banco', help='Arquivo SQLite (padrão: o banco do app).')
+    parser.add_argument('--coordenadores', type=int,
+                        help='Padrão: o suficiente para as agendas ficarem até a metade ocupadas.')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.banco:
+        # Antes de importar o app, que lê DATABASE_URL na inicialização
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.banco)}'
+    from app import app
+
+    inicio = timer.perf_counter()
+    try:
+        popular_banco(app, args.agendamentos, args.coordenadores, args.seed)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f'{args.agendamentos} agendamentos inseridos em {timer.perf_counter() - inicio:.1f} s '
+          f"({app.config['SQLALCHEMY_DATABASE_URI']}).")
+    print(f'Coordenação: {COORDENADOR_CARGA} / {COORDENADOR_CARGA}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Verifica que alterações nas referências valem em todos os workers na requisição seguinte.
+
+Uso:
+    python benchmarks/referencias_workers.py
+
+Num banco SQLite temporário, este processo (um "worker") carrega o cache de
+referências; em seguida outro processo, como um segundo worker do gunicorn,
+cadastra um setor pela tela de configurações e libera um status para a
+coordenação. Na requisição seguinte este processo precisa resolver o novo
+setor (reference_id) e aplicar a nova permissão do status (allowed_statuses),
+sem esperar o TTL do cache; termina com erro caso contrário.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+NOVO_SETOR = 'Setor criado em outro worker'
+# Status que a coordenação não pode atribuir nos status padrão
+STATUS_LIBERADO = 'Concluído-Secretaria'
+
+# Executado no outro processo, com o mesmo DATABASE_URL
+OUTRO_WORKER = f"""
+import sys
+sys.path.insert(0, {RAIZ!r})
+from app import app
+cliente = app.test_client()
+cliente.post('/login', data={{'username': 'admin', 'password': 'admin'}})
+resposta = cliente.post('/configuracoes', data={{'add_setor': '1', 'setor_nome': {NOVO_SETOR!r}}})
+if resposta.status_code != 302:
+    sys.exit('cadastro do setor: HTTP %d' % resposta.status_code)
+
+from models import Status
+with app.app_context():
+    status = Status.query.filter_by(nome={STATUS_LIBERADO!r}).one()
+    formulario = {{'update_status': '1', 'status_id': status.id, 'css_class': status.css_class,
+                   'grupo_admin': status.grupo_admin or '', 'grupo_financeiro': status.grupo_financeiro or '',
+                   'grupo_coordenacao': status.grupo_coordenacao or '', 'permitido_coordenacao': 'on'}}
+resposta = cliente.post('/configuracoes', data=formulario)
+if resposta.status_code != 302:
+    sys.exit('edição do status: HTTP %d' % resposta.status_code)
+"""
+
+
+def outro_worker(codigo):
+    resultado = subprocess.run([sys.executable, '-c', codigo], capture_output=True, text=True)
+    if resultado.returncode:
+        sys.exit(f'Falhou no outro worker:\n{resultado.stderr}')
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Antes de importar o app, que lê DATABASE_URL na inicialização
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'referencias.db')}"
+        from app import app, allowed_statuses, reference_id
+        from models import db, User
+
+        resultado = app.test_cli_runner().invoke(args=['init-db'])
+        if resultado.exit_code:
+            sys.exit(resultado.output)
+
+        falhas = []
+        with app.test_request_context():
+            coordenador = User.query.filter_by(username='user').one()
+            if reference_id('setores', NOVO_SETOR) is not None:
+                falhas.append('o setor já existia antes da alteração')
+            if STATUS_LIBERADO in allowed_statuses(coordenador):
+                falhas.append('o status já era permitido à coordenação antes da alteração')
+
+        outro_worker(OUTRO_WORKER)
+
+        with app.test_request_context():
+            if reference_id('setores', NOVO_SETOR) is None:
+                falhas.append('o setor cadastrado em outro worker não foi encontrado na requisição seguinte')
+            coordenador = User.query.filter_by(username='user').one()
+            if STATUS_LIBERADO not in allowed_statuses(coordenador):
+                falhas.append('a permissão alterada em outro worker não vale na requisição seguinte')
+
+        with app.app_context():
+            db.engine.dispose()
+
+    if falhas:
+        sys.exit('Falhou: ' + '; '.join(falhas))
+    print('OK: setores e permissões dos status alterados em outro worker valem na requisição seguinte.')
+
+
+if __name__ == '__main__':
+    main()
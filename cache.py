@@ -0,0 +1,266 @@
+"""Caches da aplicação.
+
+- Dados de referência (canais, setores, categorias, status e usuários): mudam
+  apenas pelas rotas de configuração e de administração de usuários. As
+  listas ficam em memória no processo e também no `g` da requisição. Cada
+  lista guarda a versão das referências (VersaoDados, incrementada a cada
+  alteração nessas tabelas) com que foi carregada; a versão é lida uma vez
+  por requisição, e assim uma alteração feita em um worker vale em todos a
+  partir da requisição seguinte. O TTL fica como garantia para alterações
+  feitas fora do ORM.
+- Relatórios gerados (PDF/Excel): gravados em disco, endereçados pelo
+  conteúdo que os determina (tipo, filtros, escopo do perfil e versão dos
+  dados), com remoção dos menos usados quando o tamanho máximo é atingido.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from itertools import chain
+from types import MappingProxyType
+
+from flask import current_app, g, has_app_context
+
+from metricas import CACHE_CONSULTAS, CACHE_REMOCOES, RELATORIO_DURACAO, RELATORIO_ERROS, RELATORIO_TAMANHO
+from models import db, Canal, Setor, Categoria, Status, User, VERSAO_REFERENCIAS, versao_dados
+
+ItemReferencia = namedtuple('ItemReferencia', ['id', 'nome'])
+UsuarioReferencia = namedtuple('UsuarioReferencia', ['id', 'username', 'email', 'perfil', 'is_admin'])
+SetorReferencia = namedtuple('SetorReferencia', ['id', 'nome', 'destino_financeiro'])
+StatusReferencia = namedtuple('StatusReferencia', [
+    'id', 'nome', 'css_class', 'grupo_admin', 'grupo_financeiro', 'grupo_coordenacao',
+    'permitido_coordenacao', 'permitido_financeiro', 'envia_financeiro',
+])
+
+
+def _itens(model):
+    return tuple(ItemReferencia(item.id, item.nome) for item in model.query.order_by(model.id))
+
+
+def _setores():
+    return tuple(SetorReferencia(s.id, s.nome, s.destino_financeiro) for s in Setor.query.order_by(Setor.id))
+
+
+def _statuses():
+    return tuple(
+        StatusReferencia(*(getattr(s, campo) for campo in StatusReferencia._fields))
+        for s in Status.query.order_by(Status.id)
+    )
+
+
+def _status_por_nome():
+    return MappingProxyType({s.nome: s for s in _statuses()})
+
+
+def _usuarios():
+    return tuple(
+        UsuarioReferencia(u.id, u.username, u.email, u.perfil, u.is_admin)
+        for u in User.query.order_by(User.id)
+    )
+
+
+LOADERS = {
+    'canais': lambda: _itens(Canal),
+    'setores': _setores,
+    'categorias': lambda: _itens(Categoria),
+    'statuses': _statuses,
+    'status_por_nome': _status_por_nome,
+    'usuarios': _usuarios,
+}
+
+# Entradas derivadas de outra lista, invalidadas junto com ela
+DEPENDENTES = {
+    'statuses': ('status_por_nome',),
+}
+
+
+class ReferenceCache:
+    """Cache em dois níveis (requisição e processo) para as listas de referência."""
+
+    def __init__(self, loaders):
+        self._loaders = loaders
+        self._dados = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self):
+        return current_app.config.get('REFERENCE_CACHE_TTL', 300)
+
+    def _versao(self):
+        """Versão das referências no banco, lida uma vez por requisição."""
+        if '_versao_referencias' not in g:
+            with db.session.no_autoflush:
+                g._versao_referencias = versao_dados(db.session, VERSAO_REFERENCIAS)
+        return g._versao_referencias
+
+    def get(self, nome):
+        """Retorna a lista `nome`, consultando o banco apenas se necessário."""
+        por_requisicao = g.setdefault('_referencias', {})
+        if nome in por_requisicao:
+            return por_requisicao[nome]
+
+        versao = self._versao()
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._dados.get(nome)
+        if entrada and entrada[0] > agora and entrada[1] == versao:
+            self.hits += 1
+            CACHE_CONSULTAS.inc(cache='referencias', resultado='hit')
+            valores = entrada[2]
+        else:
+            self.misses += 1
+            CACHE_CONSULTAS.inc(cache='referencias', resultado='miss')
+            # Sem autoflush: a lista pode ser pedida no meio da edição de um agendamento
+            with db.session.no_autoflush:
+                valores = self._loaders[nome]()
+            with self._lock:
+                self._dados[nome] = (agora + self._ttl(), versao, valores)
+
+        por_requisicao[nome] = valores
+        return valores
+
+    def invalidate(self, *nomes):
+        """Descarta as listas informadas (ou todas, se nenhuma for informada)."""
+        nomes = nomes or tuple(self._loaders)
+        nomes = tuple(chain(nomes, *(DEPENDENTES.get(nome, ()) for nome in nomes)))
+        with self._lock:
+            for nome in nomes:
+                self._dados.pop(nome, None)
+        if has_app_context():
+            # Após o commit a versão no banco mudou: relê na próxima consulta
+            g.pop('_versao_referencias', None)
+            por_requisicao = g.get('_referencias')
+            if por_requisicao:
+                for nome in nomes:
+                    por_requisicao.pop(nome, None)
+
+
+referencias = ReferenceCache(LOADERS)
+
+
+class ReportCache:
+    """Cache em disco dos relatórios gerados, com remoção LRU por tamanho total."""
+
+    def __init__(self):
+        self.diretorio = None
+        self.max_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def init_app(self, app):
+        self.max_bytes = app.config.get('REPORT_CACHE_MAX_BYTES', 200 * 1024 * 1024)
+        self.diretorio = app.config.get(
+            'REPORT_CACHE_DIR', os.path.join(app.instance_path, 'cache_relatorios')
+        )
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    @staticmethod
+    def key(tipo, filtros, escopo, versao):
+        """Chave do relatório: hash de tudo que determina o seu conteúdo."""
+        conteudo = json.dumps({
+            'tipo': tipo,
+            'filtros': {k: v for k, v in sorted(filtros.items()) if v},
+            'escopo': escopo,
+            'versao': versao,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+    def _caminho(self, chave, extensao):
+        return os.path.join(self.diretorio, chave + extensao)
+
+    def get(self, chave, extensao):
+        """Caminho do relatório em cache, ou None se ainda não foi gerado."""
+        caminho = self._caminho(chave, extensao)
+        try:
+            # Atualiza o horário de acesso usado na remoção LRU
+            os.utime(caminho)
+        except OSError:
+            self.misses += 1
+            CACHE_CONSULTAS.inc(cache='relatorios', resultado='miss')
+            return None
+        self.hits += 1
+        CACHE_CONSULTAS.inc(cache='relatorios', resultado='hit')
+        return caminho
+
+    def store(self, chave, extensao, gerar):
+        """Gera o relatório com `gerar(caminho)` e o grava no cache.
+
+        Retorna o caminho final e o resultado de `gerar`.
+        """
+        formato = extensao.lstrip('.')
+        fd, temporario = tempfile.mkstemp(suffix=extensao, dir=self.diretorio, prefix='.tmp-')
+        os.close(fd)
+        inicio = time.perf_counter()
+        try:
+            resultado = gerar(temporario)
+            RELATORIO_DURACAO.observe(time.perf_counter() - inicio, formato=formato)
+            RELATORIO_TAMANHO.observe(os.path.getsize(temporario), formato=formato)
+            caminho = self._caminho(chave, extensao)
+            os.replace(temporario, caminho)
+        except BaseException as e:
+            if isinstance(e, Exception):
+                RELATORIO_ERROS.inc(formato=formato)
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        self.evict(manter=caminho)
+        return caminho, resultado
+
+    def discard(self, chave, extensao):
+        try:
+            os.remove(self._caminho(chave, extensao))
+        except OSError:
+            pass
+
+    def evict(self, manter=None):
+        """Remove os relatórios acessados há mais tempo até caber em `max_bytes`.
+
+        `manter` é preservado mesmo que sozinho ultrapasse o limite (acabou de
+        ser gerado e ainda será enviado), mas o seu tamanho conta no total: os
+        demais são removidos para abrir espaço para ele.
+        """
+        with self._lock:
+            arquivos = []
+            mantido = 0
+            for nome in os.listdir(self.diretorio):
+                caminho = os.path.join(self.diretorio, nome)
+                if nome.startswith('.tmp-'):
+                    continue
+                try:
+                    info = os.stat(caminho)
+                except OSError:
+                    continue
+                if caminho == manter:
+                    mantido = info.st_size
+                else:
+                    arquivos.append((info.st_mtime, info.st_size, caminho))
+
+            total = mantido + sum(tamanho for _, tamanho, _ in arquivos)
+            for _, tamanho, caminho in sorted(arquivos):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    continue
+                total -= tamanho
+                self.evictions += 1
+                CACHE_REMOCOES.inc(cache='relatorios')
+
+    def stats(self):
+        consultas = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / consultas if consultas else 0.0,
+        }
+
+
+report_cache = ReportCache()
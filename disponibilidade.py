@@ -0,0 +1,118 @@
+"""Disponibilidade dos coordenadores em horários de meia hora.
+
+A agenda de um coordenador em um dia é um inteiro de 48 bits (um bit por
+horário, 00:00 a 23:30): bit ligado = horário ocupado. As ocupações de um
+intervalo de datas saem de uma única consulta por faixa, que usa o índice
+(coordenador_id, data_agendamento, horario); a partir daí livres, ocupados e
+o próximo horário disponível são operações de bits em memória.
+
+Agendamentos fora da grade de meia hora (ex.: importados às 10:15) ocupam o
+horário de meia hora em que começam.
+"""
+from datetime import time, timedelta
+
+from models import Agendamento
+
+SLOTS_POR_DIA = 48
+SLOTS = tuple(time(hora, minuto) for hora in range(24) for minuto in (0, 30))
+DIA_INTEIRO = (1 << SLOTS_POR_DIA) - 1
+
+
+def indice_slot(horario):
+    """Posição do horário na grade de meia hora (0 = 00:00, 47 = 23:30)."""
+    return horario.hour * 2 + (horario.minute >= 30)
+
+
+def mascara_janela(inicio, fim):
+    """Bits dos horários entre `inicio` e `fim` (inclusive)."""
+    primeiro, ultimo = indice_slot(inicio), indice_slot(fim)
+    if ultimo < primeiro:
+        return 0
+    return ((1 << (ultimo - primeiro + 1)) - 1) << primeiro
+
+
+def horarios(mascara):
+    """Horários cujos bits estão ligados na máscara, em ordem."""
+    return [slot for indice, slot in enumerate(SLOTS) if mascara >> indice & 1]
+
+
+def ocupacao(session, inicio, fim, coordenador_ids=None, ignorar_id=None):
+    """Máscara de horários ocupados por (coordenador_id, dia) entre `inicio` e `fim`.
+
+    Sem `coordenador_ids`, considera todos os coordenadores. `ignorar_id`
+    desconsidera um agendamento (o que está sendo editado). Dias sem
+    agendamentos não aparecem no resultado (máscara 0).
+    """
+    query = session.query(
+        Agendamento.coordenador_id, Agendamento.data_agendamento, Agendamento.horario
+    ).filter(Agendamento.data_agendamento.between(inicio, fim))
+    if coordenador_ids is None:
+        query = query.filter(Agendamento.coordenador_id.isnot(None))
+    else:
+        query = query.filter(Agendamento.coordenador_id.in_(list(coordenador_ids)))
+    if ignorar_id is not None:
+        query = query.filter(Agendamento.id != ignorar_id)
+
+    mascaras = {}
+    for coordenador_id, dia, horario in query:
+        chave = (coordenador_id, dia)
+        mascaras[chave] = mascaras.get(chave, 0) | 1 << indice_slot(horario)
+    return mascaras
+
+
+def dias(inicio, fim):
+    dia = inicio
+    while dia <= fim:
+        yield dia
+        dia += timedelta(days=1)
+
+
+def agenda(session, coordenador_id, inicio, fim, janela=DIA_INTEIRO, ignorar_id=None):
+    """Horários livres e ocupados de um coordenador, dia a dia.
+
+    Retorna [(dia, livres, ocupados)], com os livres restritos à `janela`.
+    """
+    mascaras = ocupacao(session, inicio, fim, [coordenador_id], ignorar_id)
+    resultado = []
+    for dia in dias(inicio, fim):
+        ocupado = mascaras.get((coordenador_id, dia), 0)
+        resultado.append((dia, horarios(~ocupado & janela), horarios(ocupado)))
+    return resultado
+
+
+def proximo_horario(session, coordenador_ids, a_partir, janela, limite_dias, bloco_dias=14):
+    """Primeiro horário livre de qualquer um dos coordenadores a partir de `a_partir`.
+
+    `a_partir` é um datetime: no primeiro dia só valem os horários que começam
+    a partir dele. Os dias são consultados em blocos de `bloco_dias` (uma
+    consulta por bloco) até achar um horário ou passar de `limite_dias`.
+
+    Retorna (dia, horario, [ids dos coordenadores livres]) ou None.
+    """
+    coordenador_ids = list(coordenador_ids)
+    if not coordenador_ids or not janela:
+        return None
+
+    primeiro_dia = a_partir.date()
+    ultimo_dia = primeiro_dia + timedelta(days=limite_dias - 1)
+    # No primeiro dia, só os horários que começam a partir de `a_partir`
+    minutos = a_partir.hour * 60 + a_partir.minute + bool(a_partir.second or a_partir.microsecond)
+    seguintes = DIA_INTEIRO & ~((1 << -(-minutos // 30)) - 1)
+
+    inicio = primeiro_dia
+    while inicio <= ultimo_dia:
+        fim = min(inicio + timedelta(days=bloco_dias - 1), ultimo_dia)
+        mascaras = ocupacao(session, inicio, fim, coordenador_ids)
+        for dia in dias(inicio, fim):
+            janela_dia = janela & seguintes if dia == primeiro_dia else janela
+            por_coordenador = [(c, mascaras.get((c, dia), 0)) for c in coordenador_ids]
+            # Horário ocupado para todos = AND das máscaras; o menor bit livre é o mais cedo
+            todos_ocupados = DIA_INTEIRO
+            for _, mascara in por_coordenador:
+                todos_ocupados &= mascara
+            livres = ~todos_ocupados & janela_dia
+            if livres:
+                indice = (livres & -livres).bit_length() - 1
+                return dia, SLOTS[indice], [c for c, mascara in por_coordenador if not mascara >> indice & 1]
+        inicio = fim + timedelta(days=1)
+    return None
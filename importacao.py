@@ -0,0 +1,213 @@
+"""Importação em lote de agendamentos a partir de planilhas (Excel ou CSV).
+
+A planilha inteira é validada de uma vez com pandas (campos obrigatórios,
+CPFs, datas, horários, nomes de canal/setor/categoria/status/coordenador e
+conflitos de horário do coordenador) e as linhas válidas são gravadas com
+INSERTs em lote (executemany) numa única transação. Os erros são informados
+pelo número da linha na planilha.
+
+Aceita tanto os cabeçalhos do Excel exportado quanto os nomes das colunas do
+modelo (CSV/Parquet), então um relatório exportado pode ser reimportado.
+"""
+import os
+from collections import namedtuple
+
+from sqlalchemy.exc import IntegrityError
+
+from models import (Agendamento, Canal, Categoria, Setor, Status, User,
+                    atualizar_estatisticas, conflito_de_horario, incrementar_versao)
+from reports import EXPORT_COLUMNS
+
+# Cabeçalho da planilha -> campo do agendamento (o ID exportado é ignorado)
+COLUNAS = {cabecalho: coluna.key for cabecalho, coluna, _ in EXPORT_COLUMNS if coluna.key != 'id'}
+COLUNAS.update({campo: campo for campo in list(COLUNAS.values())})
+
+CAMPOS = list(dict.fromkeys(COLUNAS.values()))
+
+OBRIGATORIOS = (
+    'data_agendamento', 'horario', 'canal', 'categoria', 'status', 'setor',
+    'nome_responsavel_1', 'nome_responsavel_2', 'cpf_responsavel_1', 'cpf_responsavel_2',
+)
+
+# Campos gravados pelo nome na planilha e pelo id no banco: (model, coluna do nome)
+REFERENCIAS = {
+    'canal': (Canal, 'nome'),
+    'categoria': (Categoria, 'nome'),
+    'status': (Status, 'nome'),
+    'setor': (Setor, 'nome'),
+    'coordenador': (User, 'username'),
+}
+
+# Primeira linha de dados da planilha (a linha 1 é o cabeçalho)
+PRIMEIRA_LINHA = 2
+
+Resultado = namedtuple('Resultado', ['total', 'importados', 'erros'])
+
+
+def ler_planilha(arquivo, nome_arquivo):
+    """Lê um .xlsx ou .csv como DataFrame de textos (CPFs mantêm os zeros à esquerda)."""
+    import pandas as pd
+
+    extensao = os.path.splitext(nome_arquivo)[1].lower()
+    opcoes = {'dtype': str, 'keep_default_na': False, 'na_values': ['', 'N/A']}
+    try:
+        if extensao == '.xlsx':
+            return pd.read_excel(arquivo, **opcoes)
+        if extensao == '.csv':
+            # Separador detectado automaticamente (vírgula ou ponto e vírgula)
+            return pd.read_csv(arquivo, sep=None, engine='python', encoding='utf-8-sig', **opcoes)
+    except Exception as e:
+        raise ValueError(f'Não foi possível ler a planilha: {e}') from e
+    raise ValueError('Formato não suportado. Envie um arquivo .xlsx ou .csv.')
+
+
+def _datas(valores, formatos):
+    """Converte a coluna tentando cada formato; o que não converter fica NaT."""
+    import pandas as pd
+
+    convertido = pd.to_datetime(valores, format=formatos[0], errors='coerce')
+    for formato in formatos[1:]:
+        convertido = convertido.fillna(pd.to_datetime(valores, format=formato, errors='coerce'))
+    return convertido
+
+
+def validar(session, df):
+    """Valida a planilha inteira.
+
+    Retorna (linhas válidas, erros): as linhas válidas já com os ids das
+    referências e datas/horários convertidos; os erros como (linha da
+    planilha, mensagem), ordenados pela linha.
+    """
+    import pandas as pd
+
+    df = df.rename(columns=lambda coluna: COLUNAS.get(str(coluna).strip(), str(coluna).strip()))
+    faltando = [campo for campo in OBRIGATORIOS if campo not in df.columns]
+    if faltando:
+        raise ValueError(f'Colunas obrigatórias ausentes na planilha: {", ".join(faltando)}')
+
+    dados = df.reindex(columns=CAMPOS).reset_index(drop=True).astype(object)
+    dados = dados.apply(lambda coluna: coluna.str.strip())
+    dados = dados.where(dados != '')
+    # (máscara das linhas, mensagem, campo cujo valor acompanha a mensagem)
+    problemas = []
+
+    for campo in OBRIGATORIOS:
+        problemas.append((dados[campo].isna(), f'{campo} não informado', None))
+
+    for campo in ('cpf_responsavel_1', 'cpf_responsavel_2'):
+        dados[campo] = dados[campo].str.replace(r'\D', '', regex=True)
+        problemas.append((dados[campo].notna() & (dados[campo].str.len() != 11),
+                          f'{campo} inválido (são necessários 11 dígitos)', None))
+
+    # Datas como exportadas (dd/mm/aaaa) ou ISO, inclusive células de data do Excel
+    data = _datas(dados['data_agendamento'], ['%d/%m/%Y', 'ISO8601'])
+    hora = _datas(dados['horario'], ['%H:%M', '%H:%M:%S'])
+    problemas.append((dados['data_agendamento'].notna() & data.isna(),
+                      'data_agendamento inválida', 'data_agendamento'))
+    problemas.append((dados['horario'].notna() & hora.isna(), 'horario inválido', 'horario'))
+    dados['data_agendamento'] = data.dt.date
+    dados['horario'] = hora.dt.time
+
+    # Nomes -> ids com uma consulta por tabela de referência
+    for campo, (model, coluna) in REFERENCIAS.items():
+        ids = dict(session.query(getattr(model, coluna), model.id).all())
+        dados[f'{campo}_id'] = dados[campo].map(ids).astype('Int64')
+        problemas.append((dados[campo].notna() & dados[f'{campo}_id'].isna(), f'{campo} não cadastrado', campo))
+
+    # Conflitos de horário do coordenador: entre linhas da planilha e com o banco
+    chave = ['data_agendamento', 'horario', 'coordenador_id']
+    com_horario = dados['coordenador_id'].notna() & data.notna() & hora.notna()
+    problemas.append((com_horario & dados.duplicated(chave),
+                      'conflito de horário do coordenador com outra linha da planilha', None))
+    if com_horario.any():
+        problemas.append((com_horario & _ocupados(session, dados[com_horario], chave),
+                          'conflito de horário com um agendamento já cadastrado', None))
+
+    originais = df.reset_index(drop=True)
+    invalidas = pd.Series(False, index=dados.index)
+    erros = []
+    for mascara, mensagem, campo in problemas:
+        mascara = mascara.fillna(False).astype(bool)
+        invalidas |= mascara
+        for indice in dados.index[mascara]:
+            if campo:
+                mensagem_linha = f'{mensagem}: {originais.at[indice, campo]}'
+            else:
+                mensagem_linha = mensagem
+            erros.append((int(indice) + PRIMEIRA_LINHA, mensagem_linha))
+
+    erros.sort()
+    return dados[~invalidas], erros
+
+
+def _ocupados(session, dados, chave):
+    """Marca as linhas cujo (data, horário, coordenador) já existe no banco.
+
+    Os agendamentos existentes do período e dos coordenadores da planilha são
+    carregados numa única consulta e comparados em memória.
+    """
+    import pandas as pd
+
+    existentes = session.query(
+        Agendamento.data_agendamento, Agendamento.horario, Agendamento.coordenador_id
+    ).filter(
+        Agendamento.data_agendamento.between(dados['data_agendamento'].min(), dados['data_agendamento'].max()),
+        Agendamento.coordenador_id.in_([int(c) for c in dados['coordenador_id'].unique()])
+    ).all()
+    if not existentes:
+        return pd.Series(False, index=dados.index)
+
+    ocupados = pd.DataFrame(existentes, columns=chave).drop_duplicates()
+    ocupados['coordenador_id'] = ocupados['coordenador_id'].astype('Int64')
+    cruzamento = dados[chave].merge(ocupados, on=chave, how='left', indicator=True)
+    return pd.Series((cruzamento['_merge'] == 'both').to_numpy(), index=dados.index)
+
+
+def _registros(validas):
+    """Linhas válidas no formato do INSERT (nomes trocados pelos ids, nulos como None)."""
+    campos = [campo for campo in CAMPOS if campo not in REFERENCIAS]
+    campos += [f'{campo}_id' for campo in REFERENCIAS]
+    linhas = validas[campos].astype(object)
+    return linhas.where(linhas.notna(), None).to_dict('records')
+
+
+def importar(session, df, ignorar_erros=False, lote=1000):
+    """Valida e grava os agendamentos da planilha numa única transação.
+
+    Com erros, nada é gravado, a menos que `ignorar_erros` seja usado: nesse
+    caso as linhas válidas são importadas e as demais apenas informadas.
+    """
+    import pandas as pd
+
+    validas, erros = validar(session, df)
+    if erros and not ignorar_erros:
+        return Resultado(total=len(df), importados=0, erros=erros)
+
+    registros = _registros(validas)
+    if registros:
+        connection = session.connection()
+        tabela = Agendamento.__table__
+        try:
+            for inicio in range(0, len(registros), lote):
+                connection.execute(tabela.insert(), registros[inicio:inicio + lote])
+        except IntegrityError as e:
+            # Horário ocupado por um agendamento gravado durante a importação
+            session.rollback()
+            if not conflito_de_horario(e):
+                raise
+            raise ValueError('Conflito de horário com um agendamento cadastrado durante a importação. '
+                             'Nada foi importado; tente novamente.') from e
+
+        # O INSERT em lote não passa pelos eventos do ORM: estatísticas e
+        # versão dos dados (cache de relatórios) são atualizadas aqui
+        contagens = validas.groupby(
+            ['status_id', 'setor_id', 'coordenador_id', 'data_agendamento'], dropna=False
+        ).size()
+        atualizar_estatisticas(connection, [
+            (int(status_id), int(setor_id), None if pd.isna(coordenador_id) else int(coordenador_id), dia, int(total))
+            for (status_id, setor_id, coordenador_id, dia), total in contagens.items()
+        ])
+        incrementar_versao(connection)
+
+    session.commit()
+    return Resultado(total=len(df), importados=len(registros), erros=erros)
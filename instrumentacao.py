@@ -0,0 +1,188 @@
+"""Instrumentação das consultas SQL por requisição.
+
+Eventos do engine do SQLAlchemy contam as consultas e medem o tempo de cada
+uma (também as que falham, pelo evento handle_error); hooks do Flask acumulam
+os totais da requisição e os agregam por endpoint (requisições, consultas,
+tempo no banco e as consultas mais lentas).
+
+- Em modo debug (ou com SQL_DEBUG_HEADERS), cada resposta leva os
+  cabeçalhos X-SQL-Queries e X-SQL-Time-Ms.
+- Com SQL_SLOW_QUERY_MS, as consultas mais lentas que o limite são
+  registradas no log junto com o plano de execução (EXPLAIN QUERY PLAN no
+  SQLite, EXPLAIN nos demais bancos).
+
+Nas respostas em streaming (ex.: exportação CSV com stream_with_context), as
+consultas feitas enquanto o corpo é gerado também entram nos totais, que são
+registrados ao fim do envio; os cabeçalhos, enviados antes, contam só as
+consultas anteriores. As consultas fora de requisições (fila de relatórios,
+comandos da CLI) não são contadas.
+"""
+import heapq
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+
+class EstatisticaEndpoint:
+    """Totais acumulados das requisições de um endpoint."""
+
+    def __init__(self, maximo_lentas):
+        self.requisicoes = 0
+        self.consultas = 0
+        self.max_consultas = 0
+        self.tempo_sql = 0.0
+        self.tempo_total = 0.0
+        self.maximo_lentas = maximo_lentas
+        # sql -> maior duração observada, só as `maximo_lentas` mais lentas
+        self.lentas = {}
+
+    def registrar(self, consultas, tempo_sql, tempo_total, lentas):
+        self.requisicoes += 1
+        self.consultas += consultas
+        self.max_consultas = max(self.max_consultas, consultas)
+        self.tempo_sql += tempo_sql
+        self.tempo_total += tempo_total
+        for duracao, sql in lentas:
+            if duracao > self.lentas.get(sql, 0):
+                self.lentas[sql] = duracao
+        if len(self.lentas) > self.maximo_lentas:
+            self.lentas = dict(heapq.nlargest(self.maximo_lentas, self.lentas.items(), key=lambda item: item[1]))
+
+    def to_dict(self):
+        return {
+            'requisicoes': self.requisicoes,
+            'consultas': self.consultas,
+            'consultas_por_requisicao': self.consultas / self.requisicoes,
+            'max_consultas': self.max_consultas,
+            'tempo_sql_ms': self.tempo_sql * 1000,
+            'tempo_sql_medio_ms': self.tempo_sql / self.requisicoes * 1000,
+            'tempo_medio_ms': self.tempo_total / self.requisicoes * 1000,
+            'mais_lentas': [
+                {'duracao_ms': duracao * 1000, 'sql': sql}
+                for sql, duracao in sorted(self.lentas.items(), key=lambda item: item[1], reverse=True)
+            ],
+        }
+
+
+class QueryMonitor:
+    """Contagem e tempo das consultas SQL por requisição, agregados por endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.app = None
+
+    def init_app(self, app, engine):
+        self.app = app
+        self.maximo_lentas = app.config.get('SQL_SLOWEST_PER_ENDPOINT', 5)
+
+        event.listen(engine, 'before_cursor_execute', self._antes_consulta)
+        event.listen(engine, 'after_cursor_execute', self._depois_consulta)
+        event.listen(engine, 'handle_error', self._erro_consulta)
+        app.before_request(self._inicio_requisicao)
+        app.after_request(self._fim_requisicao)
+
+    # --- Eventos do engine ---
+
+    def _antes_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('inicio_consulta', []).append(time.perf_counter())
+
+    def _depois_consulta(self, conn, cursor, statement, parameters, context, executemany):
+        duracao = time.perf_counter() - conn.info['inicio_consulta'].pop()
+        if not self._contabilizar(statement, duracao):
+            return
+
+        limite = self.app.config.get('SQL_SLOW_QUERY_MS')
+        if limite is not None and duracao * 1000 >= limite:
+            self._registrar_lenta(conn, cursor, statement, parameters, duracao, executemany)
+
+    def _erro_consulta(self, exception_context):
+        # Sem o after_cursor_execute, o início da consulta que falhou ficaria na pilha da conexão
+        conn = exception_context.connection
+        inicios = conn.info.get('inicio_consulta') if conn is not None else None
+        if inicios:
+            self._contabilizar(exception_context.statement, time.perf_counter() - inicios.pop())
+
+    def _contabilizar(self, statement, duracao):
+        """Soma a consulta aos totais da requisição atual; False fora de requisições."""
+        if not has_request_context() or 'sql' not in g:
+            return False
+
+        registro = g.sql
+        registro['consultas'] += 1
+        registro['tempo'] += duracao
+        # Heap com as consultas mais lentas da requisição (a mais rápida delas no topo)
+        if len(registro['lentas']) < self.maximo_lentas:
+            heapq.heappush(registro['lentas'], (duracao, statement))
+        elif duracao > registro['lentas'][0][0]:
+            heapq.heapreplace(registro['lentas'], (duracao, statement))
+        return True
+
+    def _registrar_lenta(self, conn, cursor, statement, parameters, duracao, executemany):
+        plano = ''
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            prefixo = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+            # Cursor DBAPI separado: não dispara os eventos nem consome o resultado da consulta
+            explain = cursor.connection.cursor()
+            try:
+                explain.execute(prefixo + statement, parameters)
+                # A última coluna é o texto do plano (`detail` no SQLite, única coluna no PostgreSQL)
+                plano = '\n'.join(str(linha[-1]) for linha in explain.fetchall())
+            except Exception as e:
+                plano = f'(plano indisponível: {e})'
+            finally:
+                explain.close()
+        self.app.logger.warning(
+            'Consulta lenta (%.1f ms) em %s: %s\nParâmetros: %r\nPlano:\n%s',
+            duracao * 1000, request.endpoint, statement, parameters, plano
+        )
+
+    # --- Hooks da requisição ---
+
+    def _inicio_requisicao(self):
+        g.sql = {'consultas': 0, 'tempo': 0.0, 'lentas': [], 'inicio': time.perf_counter()}
+
+    def _fim_requisicao(self, response):
+        registro = g.get('sql')
+        endpoint = request.endpoint
+        if registro is None or endpoint in (None, 'static'):
+            g.pop('sql', None)
+            return response
+
+        if response.is_streamed:
+            # g.sql continua recebendo as consultas do gerador até o fim do envio
+            response.call_on_close(lambda: self._registrar(endpoint, registro))
+        else:
+            g.pop('sql')
+            self._registrar(endpoint, registro)
+
+        cabecalhos = self.app.config.get('SQL_DEBUG_HEADERS')
+        if self.app.debug if cabecalhos is None else cabecalhos:
+            response.headers['X-SQL-Queries'] = str(registro['consultas'])
+            response.headers['X-SQL-Time-Ms'] = f"{registro['tempo'] * 1000:.1f}"
+        return response
+
+    def _registrar(self, endpoint, registro):
+        tempo_total = time.perf_counter() - registro['inicio']
+        with self._lock:
+            estatistica = self._endpoints.get(endpoint)
+            if estatistica is None:
+                estatistica = self._endpoints[endpoint] = EstatisticaEndpoint(self.maximo_lentas)
+            estatistica.registrar(registro['consultas'], registro['tempo'], tempo_total, registro['lentas'])
+
+    # --- Consulta das estatísticas ---
+
+    def stats(self):
+        """Estatísticas por endpoint, dos que mais consomem tempo no banco para os que menos consomem."""
+        with self._lock:
+            dados = {endpoint: estatistica.to_dict() for endpoint, estatistica in self._endpoints.items()}
+        return dict(sorted(dados.items(), key=lambda item: item[1]['tempo_sql_ms'], reverse=True))
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+query_monitor = QueryMonitor()
@@ -0,0 +1,222 @@
+"""Fila de tarefas em segundo plano para a geração de relatórios.
+
+As tarefas rodam em um pool de threads do próprio processo. A fila tem
+tamanho máximo, cada usuário tem um limite de tarefas simultâneas e os
+arquivos gerados expiram após `ttl` segundos.
+
+A situação de cada tarefa é gravada em um JSON ao lado do arquivo gerado
+(`<id>.json` no diretório de relatórios). Com vários workers (gunicorn), a
+consulta da situação e o download funcionam em qualquer um deles, e os
+limites da fila contam as tarefas de todos (de forma aproximada: dois
+workers podem aceitar tarefas ao mesmo tempo). Tarefas de um processo que
+foi encerrado no meio da geração aparecem como erro.
+"""
+import json
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+PENDENTE = 'pendente'
+EXECUTANDO = 'executando'
+CONCLUIDO = 'concluido'
+ERRO = 'erro'
+
+_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class FilaCheiaError(Exception):
+    """A fila atingiu a quantidade máxima de tarefas pendentes."""
+
+
+class LimiteUsuarioError(Exception):
+    """O usuário já possui o máximo de tarefas em andamento."""
+
+
+def _processo_vivo(host, pid):
+    """Se o processo que executa a tarefa ainda existe (só verificável no mesmo servidor)."""
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Job:
+    # Campos gravados no JSON da tarefa
+    CAMPOS = ('id', 'usuario_id', 'download_name', 'arquivo', 'status', 'erro',
+              'criado_em', 'concluido_em', 'host', 'pid')
+
+    def __init__(self, usuario_id, download_name, arquivo=None):
+        self.id = uuid.uuid4().hex
+        self.usuario_id = usuario_id
+        self.download_name = download_name
+        self.arquivo = arquivo
+        self.caminho = None
+        self.status = PENDENTE
+        self.erro = None
+        self.criado_em = time.time()
+        self.concluido_em = None
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+
+    @classmethod
+    def from_dict(cls, dados, diretorio):
+        job = cls.__new__(cls)
+        for campo in cls.CAMPOS:
+            setattr(job, campo, dados.get(campo))
+        job.caminho = os.path.join(diretorio, job.arquivo)
+        if job.ativo and not _processo_vivo(job.host, job.pid):
+            job.status = ERRO
+            job.erro = 'A geração foi interrompida. Solicite o relatório novamente.'
+            job.concluido_em = job.criado_em
+        return job
+
+    @property
+    def ativo(self):
+        return self.status in (PENDENTE, EXECUTANDO)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'erro': self.erro,
+            'criado_em': self.criado_em,
+            'concluido_em': self.concluido_em,
+        }
+
+
+class JobManager:
+    """Gerencia as tarefas de geração de relatórios, compartilhadas entre os workers pelo diretório."""
+
+    def __init__(self):
+        # Tarefas criadas por este processo (as demais são lidas dos JSON)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self.diretorio = None
+
+    def init_app(self, app):
+        self.max_pendentes = app.config.get('REPORT_JOBS_MAX_PENDING', 20)
+        self.max_por_usuario = app.config.get('REPORT_JOBS_MAX_PER_USER', 2)
+        self.ttl = app.config.get('REPORT_JOBS_TTL', 3600)
+        self.diretorio = app.config.get(
+            'REPORT_JOBS_DIR', os.path.join(app.instance_path, 'relatorios')
+        )
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('REPORT_JOBS_WORKERS', 2),
+            thread_name_prefix='relatorios'
+        )
+
+    def submit(self, usuario_id, funcao, *args, extensao='.pdf', download_name='relatorio.pdf'):
+        """Enfileira `funcao(caminho, *args)`, que deve gravar o arquivo em `caminho`."""
+        self.cleanup()
+
+        with self._lock:
+            ativos = [job for job in self._todos() if job.ativo]
+            if len(ativos) >= self.max_pendentes:
+                raise FilaCheiaError()
+            if sum(1 for job in ativos if job.usuario_id == usuario_id) >= self.max_por_usuario:
+                raise LimiteUsuarioError()
+
+            job = Job(usuario_id, download_name)
+            job.arquivo = job.id + extensao
+            job.caminho = os.path.join(self.diretorio, job.arquivo)
+            self._salvar(job)
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._executar, job, funcao, args)
+        return job
+
+    def _executar(self, job, funcao, args):
+        job.status = EXECUTANDO
+        self._salvar(job)
+        try:
+            funcao(job.caminho, *args)
+            job.status = CONCLUIDO
+        except Exception as e:
+            job.status = ERRO
+            job.erro = str(e)
+            if os.path.exists(job.caminho):
+                os.remove(job.caminho)
+        finally:
+            job.concluido_em = time.time()
+            self._salvar(job)
+
+    def _metadados(self, job_id):
+        return os.path.join(self.diretorio, job_id + '.json')
+
+    def _salvar(self, job):
+        # Grava e renomeia: os outros workers nunca leem um JSON pela metade
+        caminho = self._metadados(job.id)
+        temporario = f'{caminho}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({campo: getattr(job, campo) for campo in Job.CAMPOS}, arquivo)
+        os.replace(temporario, caminho)
+
+    def _carregar(self, job_id):
+        try:
+            with open(self._metadados(job_id), encoding='utf-8') as arquivo:
+                return Job.from_dict(json.load(arquivo), self.diretorio)
+        except (OSError, ValueError):
+            return None
+
+    def _todos(self):
+        """Tarefas de todos os workers."""
+        jobs = []
+        for nome in os.listdir(self.diretorio):
+            job_id, extensao = os.path.splitext(nome)
+            if extensao != '.json' or not _ID.match(job_id):
+                continue
+            job = self._jobs.get(job_id) or self._carregar(job_id)
+            if job:
+                jobs.append(job)
+        return jobs
+
+    def get(self, job_id):
+        if not _ID.match(job_id):
+            return None
+        self.cleanup()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job or self._carregar(job_id)
+
+    def cleanup(self):
+        """Remove as tarefas finalizadas há mais de `ttl` segundos e seus arquivos."""
+        limite = time.time() - self.ttl
+        em_uso = set()
+        expirados = []
+        with self._lock:
+            for job in self._todos():
+                if job.ativo or job.concluido_em >= limite:
+                    em_uso.add(job.caminho)
+                else:
+                    self._jobs.pop(job.id, None)
+                    expirados.extend((job.caminho, self._metadados(job.id)))
+
+        # Também remove arquivos antigos que ficaram sem tarefa (ex.: de versões anteriores)
+        for nome in os.listdir(self.diretorio):
+            caminho = os.path.join(self.diretorio, nome)
+            if caminho in em_uso or caminho in expirados:
+                continue
+            try:
+                if os.path.getmtime(caminho) < limite:
+                    os.remove(caminho)
+            except OSError:
+                pass
+
+        for caminho in expirados:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+report_jobs = JobManager()
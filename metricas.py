@@ -0,0 +1,415 @@
+"""Métricas da aplicação no formato de exposição do Prometheus (GET /metrics).
+
+Contadores, gauges e histogramas ficam num arquivo mapeado em memória (mmap)
+por processo: gravar uma métrica é atualizar 8 bytes na memória, sem chamadas
+de sistema. Com vários workers (gunicorn), cada um grava no seu arquivo em
+METRICS_DIR e o /metrics de qualquer worker soma os arquivos de todos;
+contadores e histogramas de workers encerrados continuam somando, gauges só
+contam os processos vivos (somados, ou o maior valor entre eles nos gauges de
+configuração, como o tamanho do pool, que com `gunicorn --preload` só o
+processo principal grava). O METRICS_DIR deve ser esvaziado a cada deploy.
+Sem METRICS_DIR (um único processo), os valores ficam apenas em memória.
+
+Razões (ex.: acerto dos caches) são calculadas no Prometheus a partir dos
+contadores, como em:
+    sum(rate(agendamentos_cache_requests_total{resultado="hit"}[5m]))
+      / sum(rate(agendamentos_cache_requests_total[5m]))
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, got_request_exception, request
+from sqlalchemy import event
+
+PREFIXO_ARQUIVO = 'metricas_'
+EXTENSAO_ARQUIVO = '.db'
+
+# Buckets (limites superiores) dos histogramas
+BUCKETS_REQUISICAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_RELATORIO = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BUCKETS_TAMANHO = (10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 50 * 1024 ** 2, 100 * 1024 ** 2, 500 * 1024 ** 2)
+
+
+# --- Armazenamento dos valores ---
+
+def _entradas(dados, usado):
+    """(chave, valor, posição do valor) das entradas gravadas até `usado`."""
+    posicao = 8
+    while posicao < usado:
+        tamanho = struct.unpack_from('i', dados, posicao)[0]
+        chave = bytes(dados[posicao + 4:posicao + 4 + tamanho]).decode('utf-8')
+        posicao += 4 + tamanho + (-(4 + tamanho) % 8)
+        yield chave, struct.unpack_from('d', dados, posicao)[0], posicao
+        posicao += 8
+
+
+def ler_arquivo(caminho):
+    """Entradas (chave, valor) do arquivo de métricas de um worker."""
+    with open(caminho, 'rb') as arquivo:
+        dados = arquivo.read()
+    if len(dados) < 8:
+        return []
+    return [(chave, valor) for chave, valor, _ in _entradas(dados, struct.unpack_from('i', dados, 0)[0])]
+
+
+class ArquivoMetricas:
+    """Dicionário chave -> float num arquivo mapeado em memória.
+
+    Layout: 8 bytes com o tamanho usado, seguidos das entradas
+    [tamanho da chave: 4 bytes][chave UTF-8, completada até múltiplo de 8][valor: double].
+    Uma entrada nova é gravada inteira antes de o tamanho usado ser
+    atualizado, então os outros processos nunca leem entradas pela metade.
+    """
+
+    TAMANHO_INICIAL = 64 * 1024
+
+    def __init__(self, caminho):
+        if not os.path.exists(caminho):
+            with open(caminho, 'wb') as arquivo:
+                arquivo.truncate(self.TAMANHO_INICIAL)
+        self._arquivo = open(caminho, 'r+b')
+        self._mmap = mmap.mmap(self._arquivo.fileno(), 0)
+        self._usado = struct.unpack_from('i', self._mmap, 0)[0] or 8
+        self._posicoes = {chave: posicao for chave, _, posicao in _entradas(self._mmap, self._usado)}
+
+    def somar(self, chave, valor):
+        posicao = self._posicoes.get(chave) or self._nova(chave)
+        struct.pack_into('d', self._mmap, posicao, struct.unpack_from('d', self._mmap, posicao)[0] + valor)
+
+    def definir(self, chave, valor):
+        struct.pack_into('d', self._mmap, self._posicoes.get(chave) or self._nova(chave), valor)
+
+    def _nova(self, chave):
+        codificada = chave.encode('utf-8')
+        cabecalho = 4 + len(codificada) + (-(4 + len(codificada)) % 8)
+        while self._usado + cabecalho + 8 > len(self._mmap):
+            tamanho = len(self._mmap) * 2
+            self._mmap.close()
+            self._arquivo.truncate(tamanho)
+            self._mmap = mmap.mmap(self._arquivo.fileno(), tamanho)
+
+        struct.pack_into(f'i{len(codificada)}s', self._mmap, self._usado, len(codificada), codificada)
+        posicao = self._usado + cabecalho
+        struct.pack_into('d', self._mmap, posicao, 0.0)
+        self._usado = posicao + 8
+        struct.pack_into('i', self._mmap, 0, self._usado)
+        self._posicoes[chave] = posicao
+        return posicao
+
+
+class ValoresMemoria:
+    """Mesma interface do ArquivoMetricas, para um único processo (sem METRICS_DIR)."""
+
+    def __init__(self):
+        self._valores = {}
+
+    def somar(self, chave, valor):
+        self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def definir(self, chave, valor):
+        self._valores[chave] = valor
+
+    def itens(self):
+        return list(self._valores.items())
+
+
+def _processo_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+# --- Tipos de métrica ---
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, registro, nome, descricao, rotulos=()):
+        self._registro = registro
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+        self._chaves = {}
+        registro.registrar(self)
+
+    def _chave(self, sufixo, rotulos, extra=()):
+        """Chave do armazenamento (JSON com nome, sufixo e rótulos), em cache por combinação."""
+        valores = tuple(str(rotulos[nome]) for nome in self.rotulos) + extra
+        chave = self._chaves.get((sufixo, valores))
+        if chave is None:
+            pares = list(zip(self.rotulos, valores)) + [['le', valor] for valor in extra]
+            chave = self._chaves[(sufixo, valores)] = json.dumps([self.nome, sufixo, pares])
+        return chave
+
+
+class Contador(_Metrica):
+    tipo = 'counter'
+
+    def inc(self, valor=1, **rotulos):
+        self._registro.somar(self._chave('', rotulos), valor)
+
+
+class Gauge(_Metrica):
+    """Soma dos valores dos processos vivos (ou o maior deles, com agregacao='max')."""
+    tipo = 'gauge'
+
+    def __init__(self, registro, nome, descricao, rotulos=(), agregacao='soma'):
+        super().__init__(registro, nome, descricao, rotulos)
+        self.agregacao = agregacao
+
+    def inc(self, valor=1, **rotulos):
+        self._registro.somar(self._chave('', rotulos), valor)
+
+    def dec(self, valor=1, **rotulos):
+        self._registro.somar(self._chave('', rotulos), -valor)
+
+    def set(self, valor, **rotulos):
+        self._registro.definir(self._chave('', rotulos), valor)
+
+
+class Histograma(_Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, registro, nome, descricao, rotulos=(), buckets=BUCKETS_REQUISICAO):
+        super().__init__(registro, nome, descricao, rotulos)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor, **rotulos):
+        indice = bisect.bisect_left(self.buckets, valor)
+        # Cada bucket guarda só as suas observações; a exposição acumula
+        if indice < len(self.buckets):
+            self._registro.somar(self._chave('_bucket', rotulos, (_formatar(self.buckets[indice]),)), 1)
+        self._registro.somar(self._chave('_sum', rotulos), valor)
+        self._registro.somar(self._chave('_count', rotulos), 1)
+
+
+def _formatar(valor):
+    if valor == int(valor):
+        return f'{int(valor)}.0' if abs(valor) < 1e15 else repr(float(valor))
+    return repr(float(valor))
+
+
+def _rotulos(pares):
+    if not pares:
+        return ''
+    escapados = (
+        f'{nome}="' + str(valor).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"') + '"'
+        for nome, valor in pares
+    )
+    return '{' + ','.join(escapados) + '}'
+
+
+# --- Registro ---
+
+class Metricas:
+    """Registro das métricas do processo e exposição agregada de todos os workers."""
+
+    def __init__(self):
+        self._familias = {}
+        self._lock = threading.Lock()
+        self._valores = None
+        self._pid = None
+        self.diretorio = None
+
+    def registrar(self, metrica):
+        self._familias[metrica.nome] = metrica
+
+    def contador(self, nome, descricao, rotulos=()):
+        return Contador(self, nome, descricao, rotulos)
+
+    def gauge(self, nome, descricao, rotulos=(), agregacao='soma'):
+        return Gauge(self, nome, descricao, rotulos, agregacao)
+
+    def histograma(self, nome, descricao, rotulos=(), buckets=BUCKETS_REQUISICAO):
+        return Histograma(self, nome, descricao, rotulos, buckets)
+
+    def init_app(self, app, engine):
+        self.diretorio = app.config.get('METRICS_DIR')
+        if self.diretorio:
+            os.makedirs(self.diretorio, exist_ok=True)
+        with self._lock:
+            self._valores = None
+
+        app.before_request(self._inicio_requisicao)
+        app.after_request(self._fim_requisicao)
+        app.teardown_request(self._encerrar_requisicao)
+        got_request_exception.connect(self._excecao, app, weak=False)
+
+        event.listen(engine, 'connect', lambda *_: CONEXOES_ABERTAS.inc())
+        event.listen(engine, 'close', lambda *_: CONEXOES_ABERTAS.dec())
+        event.listen(engine, 'checkout', self._checkout)
+        event.listen(engine, 'checkin', lambda *_: CONEXOES_EM_USO.dec())
+        tamanho = getattr(engine.pool, 'size', None)
+        if callable(tamanho):
+            POOL_TAMANHO.set(tamanho())
+
+    def _armazenamento(self):
+        # Depois de um fork (workers do gunicorn) cada processo abre o seu arquivo
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            if self.diretorio:
+                caminho = os.path.join(self.diretorio, f'{PREFIXO_ARQUIVO}{self._pid}{EXTENSAO_ARQUIVO}')
+                self._valores = ArquivoMetricas(caminho)
+            else:
+                self._valores = ValoresMemoria()
+        return self._valores
+
+    def somar(self, chave, valor):
+        with self._lock:
+            self._armazenamento().somar(chave, valor)
+
+    def definir(self, chave, valor):
+        with self._lock:
+            self._armazenamento().definir(chave, valor)
+
+    # --- Hooks ---
+
+    def _inicio_requisicao(self):
+        g.metricas_inicio = time.perf_counter()
+        REQUISICOES_EM_ANDAMENTO.inc()
+
+    def _fim_requisicao(self, response):
+        inicio = g.get('metricas_inicio')
+        if inicio is not None:
+            endpoint = request.endpoint or 'sem_rota'
+            metodo = request.method
+
+            def registrar():
+                REQUISICOES.inc(endpoint=endpoint, metodo=metodo, status=response.status_code)
+                DURACAO_REQUISICAO.observe(time.perf_counter() - inicio, endpoint=endpoint)
+
+            # Respostas em streaming (ex.: exportação CSV) são medidas até o fim do envio
+            if response.is_streamed:
+                response.call_on_close(registrar)
+            else:
+                registrar()
+        return response
+
+    def _encerrar_requisicao(self, exc):
+        if g.pop('metricas_inicio', None) is not None:
+            REQUISICOES_EM_ANDAMENTO.dec()
+
+    def _excecao(self, sender, exception, **extra):
+        EXCECOES.inc(endpoint=request.endpoint or 'sem_rota', excecao=type(exception).__name__)
+
+    def _checkout(self, *_):
+        CONEXOES_EM_USO.inc()
+        CHECKOUTS.inc()
+
+    # --- Exposição ---
+
+    def _amostras(self):
+        """(chave, valor, processo vivo) de todos os workers."""
+        if not self.diretorio:
+            with self._lock:
+                return [(chave, valor, True) for chave, valor in self._armazenamento().itens()]
+
+        amostras = []
+        for nome in os.listdir(self.diretorio):
+            if not (nome.startswith(PREFIXO_ARQUIVO) and nome.endswith(EXTENSAO_ARQUIVO)):
+                continue
+            try:
+                pid = int(nome[len(PREFIXO_ARQUIVO):-len(EXTENSAO_ARQUIVO)])
+                entradas = ler_arquivo(os.path.join(self.diretorio, nome))
+            except (ValueError, OSError):
+                continue
+            vivo = _processo_vivo(pid)
+            amostras.extend((chave, valor, vivo) for chave, valor in entradas)
+        return amostras
+
+    def exposicao(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        totais = defaultdict(float)
+        for chave, valor, vivo in self._amostras():
+            nome, sufixo, pares = json.loads(chave)
+            familia = self._familias.get(nome)
+            if familia is None or (familia.tipo == 'gauge' and not vivo):
+                continue
+            serie = (nome, sufixo, tuple(map(tuple, pares)))
+            if getattr(familia, 'agregacao', 'soma') == 'max':
+                totais[serie] = max(totais[serie], valor) if serie in totais else valor
+            else:
+                totais[serie] += valor
+
+        por_familia = defaultdict(dict)
+        for (nome, sufixo, pares), valor in totais.items():
+            por_familia[nome][(sufixo, pares)] = valor
+
+        linhas = []
+        for nome in sorted(self._familias):
+            familia = self._familias[nome]
+            linhas.append(f'# HELP {nome} {familia.descricao}')
+            linhas.append(f'# TYPE {nome} {familia.tipo}')
+            valores = por_familia.get(nome, {})
+            if familia.tipo == 'histogram':
+                linhas.extend(self._linhas_histograma(familia, valores))
+            else:
+                for (_, pares), valor in sorted(valores.items()):
+                    linhas.append(f'{nome}{_rotulos(pares)} {_formatar(valor)}')
+        return '\n'.join(linhas) + '\n'
+
+    @staticmethod
+    def _linhas_histograma(familia, valores):
+        series = defaultdict(dict)
+        for (sufixo, pares), valor in valores.items():
+            base = tuple(par for par in pares if par[0] != 'le')
+            le = next((par[1] for par in pares if par[0] == 'le'), None)
+            series[base][(sufixo, le)] = valor
+
+        for base, serie in sorted(series.items()):
+            acumulado = 0.0
+            for limite in familia.buckets:
+                acumulado += serie.get(('_bucket', _formatar(limite)), 0.0)
+                yield f'{familia.nome}_bucket{_rotulos(base + (("le", _formatar(limite)),))} {_formatar(acumulado)}'
+            total = serie.get(('_count', None), 0.0)
+            yield f'{familia.nome}_bucket{_rotulos(base + (("le", "+Inf"),))} {_formatar(total)}'
+            yield f'{familia.nome}_sum{_rotulos(base)} {_formatar(serie.get(("_sum", None), 0.0))}'
+            yield f'{familia.nome}_count{_rotulos(base)} {_formatar(total)}'
+
+
+metricas = Metricas()
+
+# --- Métricas da aplicação ---
+
+REQUISICOES = metricas.contador(
+    'agendamentos_http_requests_total', 'Requisições HTTP atendidas.', ['endpoint', 'metodo', 'status'])
+DURACAO_REQUISICAO = metricas.histograma(
+    'agendamentos_http_request_duration_seconds',
+    'Duração das requisições HTTP (nas respostas em streaming, até o fim do envio).',
+    ['endpoint'])
+REQUISICOES_EM_ANDAMENTO = metricas.gauge(
+    'agendamentos_http_requests_in_flight', 'Requisições HTTP em andamento.')
+EXCECOES = metricas.contador(
+    'agendamentos_exceptions_total', 'Exceções não tratadas nas requisições.', ['endpoint', 'excecao'])
+
+RELATORIO_DURACAO = metricas.histograma(
+    'agendamentos_report_duration_seconds', 'Tempo de geração dos relatórios (cache não usado).',
+    ['formato'], BUCKETS_RELATORIO)
+RELATORIO_TAMANHO = metricas.histograma(
+    'agendamentos_report_size_bytes', 'Tamanho dos relatórios gerados.', ['formato'], BUCKETS_TAMANHO)
+RELATORIO_ERROS = metricas.contador(
+    'agendamentos_report_errors_total', 'Falhas na geração de relatórios.', ['formato'])
+
+CACHE_CONSULTAS = metricas.contador(
+    'agendamentos_cache_requests_total', 'Consultas aos caches (hit ou miss).', ['cache', 'resultado'])
+CACHE_REMOCOES = metricas.contador(
+    'agendamentos_cache_evictions_total', 'Itens removidos dos caches por falta de espaço.', ['cache'])
+
+POOL_TAMANHO = metricas.gauge(
+    'agendamentos_db_pool_size', 'Tamanho configurado do pool de conexões de cada worker.', agregacao='max')
+CONEXOES_ABERTAS = metricas.gauge(
+    'agendamentos_db_connections_open', 'Conexões com o banco abertas.')
+CONEXOES_EM_USO = metricas.gauge(
+    'agendamentos_db_connections_in_use', 'Conexões com o banco emprestadas pelo pool.')
+CHECKOUTS = metricas.contador(
+    'agendamentos_db_pool_checkouts_total', 'Conexões emprestadas pelo pool.')
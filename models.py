@@ -2,6 +2,13 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+from itertools import chain
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
 
 db = SQLAlchemy()
 
@@ -12,6 +19,10 @@ class Canal(db.Model):
 class Setor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), unique=True, nullable=False)
+    # Setor para onde a coordenação envia os agendamentos aptos (status com
+    # envia_financeiro) e que bloqueia a edição pela coordenação; pelo
+    # metadado e não pelo nome, para continuar valendo se o setor for renomeado
+    destino_financeiro = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
 class Categoria(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -46,30 +57,486 @@ class User(UserMixin, db.Model):
         return check_password_hash(self.password_hash, password)
 
 
+# Grupos usados nos contadores do dashboard de cada perfil
+GRUPO_ABERTO = 'aberto'
+GRUPO_CONCLUIDO = 'concluido'
+
+
 class Status(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(50), unique=True, nullable=False)
 
+    # Metadados carregados em memória (cache de referências) e usados na
+    # exibição, nos contadores e nas permissões de cada perfil
+    css_class = db.Column(db.String(100), nullable=False, default='badge bg-secondary',
+                          server_default='badge bg-secondary')
+    # Grupo do status nos cards de cada perfil: 'aberto', 'concluido' ou nulo
+    grupo_admin = db.Column(db.String(20))
+    # Nulo também significa que o status não é visível para o financeiro
+    grupo_financeiro = db.Column(db.String(20))
+    grupo_coordenacao = db.Column(db.String(20))
+    # Status que cada perfil pode atribuir (o admin pode atribuir qualquer um)
+    permitido_coordenacao = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    permitido_financeiro = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    # Ao ser atribuído pela coordenação, envia o agendamento ao Financeiro (com confirmação)
+    envia_financeiro = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+
     def __repr__(self):
         return f'<Status {self.nome}>'
 
+
+# Metadados dos status criados pelo init-db
+STATUS_PADRAO = {
+    'Aberto-Coordenação': dict(
+        grupo_admin=GRUPO_ABERTO, grupo_coordenacao=GRUPO_ABERTO, permitido_coordenacao=True),
+    'Em andamento-Coordenação': dict(
+        grupo_admin=GRUPO_ABERTO, grupo_coordenacao=GRUPO_ABERTO, permitido_coordenacao=True),
+    'Remarcado-Coordenação': dict(
+        grupo_admin=GRUPO_ABERTO, grupo_coordenacao=GRUPO_ABERTO, permitido_coordenacao=True),
+    'Apto-Coordenação': dict(
+        css_class='badge status-apto-coordenacao',
+        grupo_admin=GRUPO_ABERTO, grupo_financeiro=GRUPO_ABERTO, grupo_coordenacao=GRUPO_CONCLUIDO,
+        permitido_coordenacao=True, envia_financeiro=True),
+    'Não-Apto-Coordenação': dict(
+        css_class='badge status-nao-apto-coordenacao',
+        grupo_admin=GRUPO_ABERTO, grupo_coordenacao=GRUPO_CONCLUIDO, permitido_coordenacao=True),
+    'Apto-Financeiro': dict(
+        css_class='badge status-apto-financeiro',
+        grupo_admin=GRUPO_ABERTO, grupo_financeiro=GRUPO_CONCLUIDO, grupo_coordenacao=GRUPO_CONCLUIDO,
+        permitido_financeiro=True),
+    'Não-Apto-Financeiro': dict(
+        css_class='badge status-nao-apto-financeiro',
+        grupo_admin=GRUPO_ABERTO, grupo_financeiro=GRUPO_CONCLUIDO, grupo_coordenacao=GRUPO_CONCLUIDO,
+        permitido_financeiro=True),
+    'Concluído-Secretaria': dict(
+        css_class='badge status-concluido-secretaria',
+        grupo_admin=GRUPO_CONCLUIDO, grupo_coordenacao=GRUPO_CONCLUIDO),
+}
+
+
+# Setor marcado como destino do Financeiro pelo init-db e pelo upgrade-db
+SETOR_FINANCEIRO = 'Financeiro'
+
+
+def aplicar_metadados_padrao(session):
+    """Preenche os metadados dos status padrão e o setor de destino do Financeiro ainda não configurados."""
+    atualizados = 0
+    if not session.query(Setor).filter_by(destino_financeiro=True).first():
+        setor = session.query(Setor).filter_by(nome=SETOR_FINANCEIRO).first()
+        if setor:
+            setor.destino_financeiro = True
+            atualizados += 1
+    for status in session.query(Status).filter(Status.nome.in_(list(STATUS_PADRAO))):
+        configurado = (status.grupo_admin or status.grupo_financeiro or status.grupo_coordenacao
+                       or status.permitido_coordenacao or status.permitido_financeiro)
+        if not configurado:
+            for campo, valor in STATUS_PADRAO[status.nome].items():
+                setattr(status, campo, valor)
+            atualizados += 1
+    session.commit()
+    return atualizados
+
+def _referencia(nome, relacao, coluna_id, model, campo='nome'):
+    """Atributo compatível com a antiga coluna de texto de Agendamento.
+
+    Lê e grava pelo nome (templates, formulários e exportações continuam
+    usando `agendamento.status`, `agendamento.canal`...), mas o que fica
+    gravado na linha é o id. Em consultas, `Agendamento.<nome>` vira uma
+    subconsulta pelo nome; nos caminhos frequentes prefira filtrar pelo id.
+    """
+    def fget(self):
+        ref = getattr(self, relacao)
+        return getattr(ref, campo) if ref is not None else None
+
+    def fset(self, valor):
+        ref = None
+        if valor:
+            with db.session.no_autoflush:
+                ref = model.query.filter(getattr(model, campo) == valor).first()
+            if ref is None:
+                raise ValueError(f'{model.__name__} não cadastrado: {valor}')
+        setattr(self, relacao, ref)
+        setattr(self, coluna_id, ref.id if ref is not None else None)
+
+    def expr(cls):
+        return db.select(getattr(model, campo)).where(
+            model.id == getattr(cls, coluna_id)
+        ).scalar_subquery().label(nome)
+
+    # O hybrid descobre o nome do atributo (`.key`, usado nos cabeçalhos do CSV) pelo getter
+    fget.__name__ = nome
+    return hybrid_property(fget, fset, expr=expr)
+
+
+# Índice único (coordenador, data, horário): o banco impede dois agendamentos
+# do mesmo coordenador no mesmo horário, mesmo com requisições simultâneas
+INDICE_HORARIO_COORDENADOR = 'uq_agendamento_coordenador_horario'
+
+
 class Agendamento(db.Model):
+    __table_args__ = (
+        # Listagem do dashboard (ordenação e paginação por cursor)
+        db.Index('ix_agendamento_data_horario', 'data_agendamento', 'horario', 'id'),
+        # Visão da coordenação e conflito de horário (agendamentos sem coordenador não conflitam)
+        db.Index(INDICE_HORARIO_COORDENADOR, 'coordenador_id', 'data_agendamento', 'horario', unique=True),
+        # Filtros por status/setor com a mesma ordenação da listagem
+        db.Index('ix_agendamento_status_data', 'status_id', 'data_agendamento', 'horario'),
+        db.Index('ix_agendamento_setor_data', 'setor_id', 'data_agendamento', 'horario'),
+        # Histórico de uma família pelo CPF de qualquer um dos responsáveis
+        db.Index('ix_agendamento_cpf_1', 'cpf_responsavel_1'),
+        db.Index('ix_agendamento_cpf_2', 'cpf_responsavel_2'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     data = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    canal = db.Column(db.String(100), nullable=False)
+    canal_id = db.Column(db.Integer, db.ForeignKey('canal.id'), nullable=False)
     nome_responsavel_2 = db.Column(db.String(150), nullable=False)
     nome_responsavel_1 = db.Column(db.String(150), nullable=False)
     cpf_responsavel_1 = db.Column(db.String(11), nullable=False)
     cpf_responsavel_2 = db.Column(db.String(11), nullable=False)
-    categoria = db.Column(db.String(100), nullable=False)
-    status = db.Column(db.String(50), nullable=False, default='Agendado')
-    setor = db.Column(db.String(100), nullable=False)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categoria.id'), nullable=False)
+    # active_history: o valor anterior é necessário para manter as estatísticas
+    status_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('status.id'), nullable=False), active_history=True)
+    setor_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('setor.id'), nullable=False), active_history=True)
     aluno = db.Column(db.String(150))
     escolaAluno = db.Column(db.String(255)) 
     motivo = db.Column(db.Text)
-    data_agendamento = db.Column(db.Date, nullable=False)
+    data_agendamento = db.column_property(db.Column(db.Date, nullable=False), active_history=True)
     horario = db.Column(db.Time, nullable=False)
-    coordenador = db.Column(db.String(150))
+    coordenador_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('user.id')), active_history=True)
     observacao = db.Column(db.Text)
 
+    # Tabelas de referência pequenas: carregadas no mesmo SELECT (JOIN pela PK)
+    canal_ref = db.relationship(Canal, lazy='joined')
+    categoria_ref = db.relationship(Categoria, lazy='joined')
+    status_ref = db.relationship('Status', lazy='joined')
+    setor_ref = db.relationship(Setor, lazy='joined')
+    coordenador_ref = db.relationship(User, lazy='joined')
+
+    canal = _referencia('canal', 'canal_ref', 'canal_id', Canal)
+    categoria = _referencia('categoria', 'categoria_ref', 'categoria_id', Categoria)
+    status = _referencia('status', 'status_ref', 'status_id', Status)
+    setor = _referencia('setor', 'setor_ref', 'setor_id', Setor)
+    coordenador = _referencia('coordenador', 'coordenador_ref', 'coordenador_id', User, campo='username')
+
+
+class EstatisticaAgendamento(db.Model):
+    """Contadores de agendamentos por (status, setor, coordenador, dia).
+
+    Mantida pelos eventos de Agendamento abaixo; agendamentos sem coordenador
+    são contados com coordenador_id 0 para que a chave primária funcione.
+    Reconstruída com `flask rebuild-stats`.
+    """
+    __tablename__ = 'estatistica_agendamento'
+
+    status_id = db.Column(db.Integer, primary_key=True, default=0)
+    setor_id = db.Column(db.Integer, primary_key=True, default=0)
+    coordenador_id = db.Column(db.Integer, primary_key=True, default=0)
+    dia = db.Column(db.Date, primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+
+
+class VersaoDados(db.Model):
+    """Versão dos dados de uma tabela, incrementada a cada escrita.
+
+    Usada como parte da chave do cache de relatórios: qualquer alteração em
+    agendamentos invalida os relatórios gerados anteriormente.
+    """
+    __tablename__ = 'versao_dados'
+
+    nome = db.Column(db.String(50), primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+
+
+def incrementar_versao(connection, nome='agendamentos'):
+    tabela = VersaoDados.__table__
+    result = connection.execute(
+        tabela.update().where(tabela.c.nome == nome).values(versao=tabela.c.versao + 1)
+    )
+    if result.rowcount == 0:
+        connection.execute(tabela.insert().values(nome=nome, versao=1))
+
+
+def versao_dados(session, nome='agendamentos'):
+    return session.query(VersaoDados.versao).filter_by(nome=nome).scalar() or 0
+
+
+# Versão das tabelas de referência (canais, setores, categorias, status e
+# usuários): cada worker recarrega o seu cache de referências quando ela muda
+VERSAO_REFERENCIAS = 'referencias'
+MODELOS_REFERENCIA = (Canal, Setor, Categoria, Status, User)
+
+
+@event.listens_for(Session, 'after_flush')
+def _versao_after_flush(session, flush_context):
+    # Em after_flush, new/dirty/deleted ainda refletem o estado anterior ao flush.
+    # Renomear um canal, setor, status... também muda o conteúdo dos relatórios.
+    alterados = list(chain(session.new, session.dirty, session.deleted))
+    if any(isinstance(obj, (Agendamento,) + MODELOS_REFERENCIA) for obj in alterados):
+        incrementar_versao(session.connection())
+    if any(isinstance(obj, MODELOS_REFERENCIA) for obj in alterados):
+        incrementar_versao(session.connection(), VERSAO_REFERENCIAS)
+
+
+# --- Manutenção incremental das estatísticas ---
+
+CAMPOS_ESTATISTICA = ('status_id', 'setor_id', 'coordenador_id', 'data_agendamento')
+
+
+def adicionar_colunas_faltantes(connection):
+    """Adiciona (ALTER TABLE) as colunas dos models que ainda não existem no banco.
+
+    Colunas NOT NULL precisam de `server_default` para serem adicionadas a
+    tabelas com dados. Retorna a lista de (tabela, coluna) adicionadas.
+    """
+    existentes = sa_inspect(connection)
+    adicionadas = []
+    for tabela in db.metadata.sorted_tables:
+        if not existentes.has_table(tabela.name):
+            continue
+        nomes = {coluna['name'] for coluna in existentes.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name in nomes:
+                continue
+            definicao = CreateColumn(coluna).compile(dialect=connection.dialect)
+            # Nome entre aspas quando necessário ("user" é palavra reservada no PostgreSQL)
+            nome_tabela = connection.dialect.identifier_preparer.format_table(tabela)
+            connection.exec_driver_sql(f'ALTER TABLE {nome_tabela} ADD COLUMN {definicao}')
+            adicionadas.append((tabela.name, coluna.name))
+    return adicionadas
+
+
+def conflito_de_horario(erro):
+    """Se o IntegrityError veio do índice único de horário do coordenador."""
+    mensagem = str(erro.orig)
+    # PostgreSQL informa o nome do índice; SQLite, as colunas
+    return (INDICE_HORARIO_COORDENADOR in mensagem
+            or 'agendamento.coordenador_id, agendamento.data_agendamento, agendamento.horario' in mensagem)
+
+
+def horarios_duplicados(connection):
+    """(coordenador_id, data, horário, quantidade) com mais de um agendamento.
+
+    Impedem a criação do índice único em bancos que já tinham conflitos.
+    """
+    return connection.execute(
+        db.select(Agendamento.coordenador_id, Agendamento.data_agendamento, Agendamento.horario, db.func.count())
+        .where(Agendamento.coordenador_id.isnot(None))
+        .group_by(Agendamento.coordenador_id, Agendamento.data_agendamento, Agendamento.horario)
+        .having(db.func.count() > 1)
+    ).all()
+
+
+# Colunas de texto antigas de agendamento -> (coluna de id, tabela, coluna do nome)
+_REFERENCIAS_ANTIGAS = {
+    'canal': ('canal_id', 'canal', 'nome'),
+    'categoria': ('categoria_id', 'categoria', 'nome'),
+    'status': ('status_id', 'status', 'nome'),
+    'setor': ('setor_id', 'setor', 'nome'),
+    'coordenador': ('coordenador_id', '"user"', 'username'),
+}
+
+
+def migrar_referencias(connection):
+    """Converte um banco com canal/setor/categoria/status/coordenador em texto para ids.
+
+    A tabela agendamento é recriada (o SQLite não altera o tipo nem adiciona
+    colunas NOT NULL sem default) e as linhas são copiadas trocando cada nome
+    pelo id correspondente. Nomes de canal, setor, categoria e status que não
+    existiam nas tabelas de referência são cadastrados; coordenadores sem
+    usuário correspondente ficam sem coordenador e são listados no retorno.
+    A tabela de estatísticas é recriada vazia (reconstruída pelo upgrade-db).
+
+    Retorna None se o banco já está no formato novo ou a lista de
+    coordenadores sem usuário.
+    """
+    existentes = sa_inspect(connection)
+    colunas = {coluna['name'] for coluna in existentes.get_columns('agendamento')}
+    if 'canal' not in colunas:
+        return None
+
+    # Índices e triggers ficam presos à tabela antiga e têm os mesmos nomes
+    for index in existentes.get_indexes('agendamento'):
+        connection.exec_driver_sql(f'DROP INDEX IF EXISTS {index["name"]}')
+    for trigger in ('agendamento_busca_ai', 'agendamento_busca_au', 'agendamento_busca_ad'):
+        connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {trigger}')
+    if existentes.has_table('agendamento_busca'):
+        connection.exec_driver_sql('DELETE FROM agendamento_busca')
+
+    connection.exec_driver_sql('ALTER TABLE agendamento RENAME TO agendamento_antigo')
+
+    for coluna in ('canal', 'categoria', 'status', 'setor'):
+        _, tabela, campo = _REFERENCIAS_ANTIGAS[coluna]
+        connection.exec_driver_sql(
+            f'INSERT INTO {tabela} ({campo}) SELECT DISTINCT {coluna} FROM agendamento_antigo '
+            f'WHERE {coluna} IS NOT NULL AND {coluna} NOT IN (SELECT {campo} FROM {tabela})'
+        )
+
+    sem_usuario = [linha[0] for linha in connection.exec_driver_sql(
+        'SELECT DISTINCT coordenador FROM agendamento_antigo '
+        'WHERE coordenador IS NOT NULL AND coordenador NOT IN (SELECT username FROM "user")'
+    )]
+
+    # Cria a tabela nova com índices e (via after_create) as triggers de busca.
+    # O índice único de horário sai até a cópia: bancos antigos podem ter
+    # horários duplicados, verificados pelo upgrade-db antes de recriá-lo
+    Agendamento.__table__.create(connection)
+    connection.exec_driver_sql(f'DROP INDEX {INDICE_HORARIO_COORDENADOR}')
+
+    # Colunas que bancos muito antigos não tinham ficam com o valor padrão
+    copiadas = [f'"{coluna}"' for coluna in (
+        'id', 'data', 'nome_responsavel_2', 'nome_responsavel_1', 'cpf_responsavel_1',
+        'cpf_responsavel_2', 'aluno', 'escolaAluno', 'motivo', 'data_agendamento',
+        'horario', 'observacao'
+    ) if coluna in colunas]
+    destino = copiadas + [coluna_id for coluna_id, _, _ in _REFERENCIAS_ANTIGAS.values()]
+    origem = [f'a.{coluna}' for coluna in copiadas] + [
+        f'(SELECT id FROM {tabela} WHERE {campo} = a.{coluna})'
+        for coluna, (_, tabela, campo) in _REFERENCIAS_ANTIGAS.items()
+    ]
+    connection.exec_driver_sql(
+        f'INSERT INTO agendamento ({", ".join(destino)}) '
+        f'SELECT {", ".join(origem)} FROM agendamento_antigo a'
+    )
+    connection.exec_driver_sql('DROP TABLE agendamento_antigo')
+
+    tabela_estatisticas = EstatisticaAgendamento.__table__
+    if existentes.has_table(tabela_estatisticas.name):
+        tabela_estatisticas.drop(connection)
+    tabela_estatisticas.create(connection)
+
+    return sem_usuario
+
+
+def atualizar_estatistica(connection, status_id, setor_id, coordenador_id, dia, delta):
+    """Soma `delta` ao contador da chave (status, setor, coordenador, dia)."""
+    atualizar_estatisticas(connection, [(status_id, setor_id, coordenador_id, dia, delta)])
+
+
+def atualizar_estatisticas(connection, deltas):
+    """Soma vários deltas de uma vez: [(status, setor, coordenador, dia, delta), ...].
+
+    No SQLite e no PostgreSQL é um único upsert em lote (executemany), usado
+    pela importação em lote em vez de um comando por chave.
+    """
+    tabela = EstatisticaAgendamento.__table__
+    linhas = [
+        {
+            'status_id': status_id or 0,
+            'setor_id': setor_id or 0,
+            'coordenador_id': coordenador_id or 0,
+            'dia': dia,
+            'total': delta,
+        }
+        for status_id, setor_id, coordenador_id, dia, delta in deltas
+    ]
+    if not linhas:
+        return
+    chave = ['status_id', 'setor_id', 'coordenador_id', 'dia']
+
+    dialeto = connection.dialect.name
+    if dialeto in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialeto == 'sqlite' else postgresql_insert
+        stmt = insert(tabela)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=chave,
+            set_={'total': tabela.c.total + stmt.excluded.total}
+        )
+        connection.execute(stmt, linhas)
+        return
+
+    for valores in linhas:
+        result = connection.execute(
+            tabela.update().where(*[tabela.c[campo] == valores[campo] for campo in chave])
+            .values(total=tabela.c.total + valores['total'])
+        )
+        if result.rowcount == 0:
+            connection.execute(tabela.insert().values(**valores))
+
+
+def _chave_estatistica(target, anterior=False):
+    """Chave atual do agendamento ou, com `anterior`, a chave antes do flush."""
+    state = sa_inspect(target)
+    chave = []
+    for campo in CAMPOS_ESTATISTICA:
+        history = state.attrs[campo].history
+        if anterior and history.added:
+            # Sem valor em `deleted` significa que o valor anterior era None
+            chave.append(history.deleted[0] if history.deleted else None)
+        else:
+            chave.append(getattr(target, campo))
+    return tuple(chave)
+
+
+@event.listens_for(Agendamento, 'after_insert')
+def _estatistica_after_insert(mapper, connection, target):
+    atualizar_estatistica(connection, *_chave_estatistica(target), delta=1)
+
+
+@event.listens_for(Agendamento, 'after_update')
+def _estatistica_after_update(mapper, connection, target):
+    chave_anterior = _chave_estatistica(target, anterior=True)
+    chave_atual = _chave_estatistica(target)
+    if chave_anterior != chave_atual:
+        atualizar_estatistica(connection, *chave_anterior, delta=-1)
+        atualizar_estatistica(connection, *chave_atual, delta=1)
+
+
+@event.listens_for(Agendamento, 'after_delete')
+def _estatistica_after_delete(mapper, connection, target):
+    atualizar_estatistica(connection, *_chave_estatistica(target, anterior=True), delta=-1)
+
+
+def _contagens_reais(session):
+    """Contagens calculadas diretamente da tabela agendamento, no formato da chave."""
+    linhas = session.query(
+        Agendamento.status_id,
+        Agendamento.setor_id,
+        db.func.coalesce(Agendamento.coordenador_id, 0),
+        Agendamento.data_agendamento,
+        db.func.count(Agendamento.id)
+    ).group_by(
+        Agendamento.status_id,
+        Agendamento.setor_id,
+        Agendamento.coordenador_id,
+        Agendamento.data_agendamento
+    ).all()
+
+    contagens = {}
+    for status_id, setor_id, coordenador_id, dia, total in linhas:
+        chave = (status_id, setor_id, coordenador_id, dia)
+        contagens[chave] = contagens.get(chave, 0) + total
+    return contagens
+
+
+def reconstruir_estatisticas(session):
+    """Recria todos os contadores a partir da tabela agendamento."""
+    contagens = _contagens_reais(session)
+    session.query(EstatisticaAgendamento).delete(synchronize_session=False)
+    if contagens:
+        session.execute(EstatisticaAgendamento.__table__.insert(), [
+            {'status_id': status_id, 'setor_id': setor_id, 'coordenador_id': coordenador_id,
+             'dia': dia, 'total': total}
+            for (status_id, setor_id, coordenador_id, dia), total in contagens.items()
+        ])
+    session.commit()
+    return len(contagens)
+
+
+def verificar_estatisticas(session):
+    """Lista as chaves cujo contador difere da contagem real: (chave, esperado, gravado)."""
+    esperado = _contagens_reais(session)
+    gravado = {
+        (e.status_id, e.setor_id, e.coordenador_id, e.dia): e.total
+        for e in session.query(EstatisticaAgendamento).filter(EstatisticaAgendamento.total != 0)
+    }
+    return [
+        (chave, esperado.get(chave, 0), gravado.get(chave, 0))
+        for chave in sorted(set(esperado) | set(gravado), key=str)
+        if esperado.get(chave, 0) != gravado.get(chave, 0)
+    ]
+
 
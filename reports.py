@@ -0,0 +1,208 @@
+"""Geração dos arquivos de relatório a partir das consultas de agendamentos.
+
+As linhas são lidas em lotes (`yield_per`) carregando apenas as colunas
+exportadas e gravadas diretamente no arquivo de saída, de modo que o uso de
+memória não depende da quantidade de agendamentos exportados.
+"""
+import csv
+import io
+import os
+import tempfile
+
+import xlsxwriter
+
+from models import Agendamento
+
+
+def _texto(valor):
+    return valor or 'N/A'
+
+
+def _data(valor):
+    return valor.strftime('%d/%m/%Y') if valor else 'N/A'
+
+
+def _hora(valor):
+    return valor.strftime('%H:%M') if valor else 'N/A'
+
+
+# (cabeçalho, coluna, formatação) na ordem do arquivo exportado
+EXPORT_COLUMNS = [
+    ('ID', Agendamento.id, lambda valor: valor),
+    ('Data Agendamento', Agendamento.data_agendamento, _data),
+    ('Horário', Agendamento.horario, _hora),
+    ('Canal', Agendamento.canal, _texto),
+    ('Nome Responsável 1', Agendamento.nome_responsavel_1, _texto),
+    ('CPF Responsável 1', Agendamento.cpf_responsavel_1, _texto),
+    ('Nome Responsável 2', Agendamento.nome_responsavel_2, _texto),
+    ('CPF Responsável 2', Agendamento.cpf_responsavel_2, _texto),
+    ('Status', Agendamento.status, _texto),
+    ('Setor', Agendamento.setor, _texto),
+    ('Aluno', Agendamento.aluno, _texto),
+    ('Escola do Aluno', Agendamento.escolaAluno, _texto),
+    ('Categoria', Agendamento.categoria, _texto),
+    ('Motivo', Agendamento.motivo, _texto),
+    ('Coordenador', Agendamento.coordenador, _texto),
+    ('Observação', Agendamento.observacao, lambda valor: valor or ''),
+]
+
+EXPORT_HEADERS = [cabecalho for cabecalho, _, _ in EXPORT_COLUMNS]
+
+EXCEL_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# CSV e Parquet são consumidos por ferramentas (BI): nomes das colunas do modelo e valores crus
+RAW_HEADERS = [coluna.key for _, coluna, _ in EXPORT_COLUMNS]
+
+
+def iter_export_rows(query, chunk_size=1000, formatar=True):
+    """Percorre a consulta em lotes, produzindo uma lista de valores por agendamento.
+
+    Com `formatar` os valores saem como no Excel (datas dd/mm/aaaa, 'N/A'...);
+    sem ele, saem como lidos do banco.
+    """
+    colunas = [coluna for _, coluna, _ in EXPORT_COLUMNS]
+    formatos = [formato for _, _, formato in EXPORT_COLUMNS]
+
+    for row in query.with_entities(*colunas).yield_per(chunk_size):
+        if formatar:
+            yield [formato(valor) for formato, valor in zip(formatos, row)]
+        else:
+            yield list(row)
+
+
+def write_excel(rows, destino):
+    """Grava as linhas em um .xlsx no modo de memória constante do XlsxWriter.
+
+    `destino` pode ser um caminho ou um arquivo aberto em modo binário.
+    Retorna a quantidade de linhas de dados gravadas.
+    """
+    workbook = xlsxwriter.Workbook(destino, {'constant_memory': True})
+    try:
+        worksheet = workbook.add_worksheet('Dados')
+        negrito = workbook.add_format({'bold': True})
+        worksheet.write_row(0, 0, EXPORT_HEADERS, negrito)
+
+        total = 0
+        for total, row in enumerate(rows, start=1):
+            worksheet.write_row(total, 0, row)
+    finally:
+        workbook.close()
+    return total
+
+
+def iter_csv(rows, linhas_por_bloco=1000):
+    """Gera o CSV em blocos de texto, para envio como resposta HTTP em streaming."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(RAW_HEADERS)
+
+    for numero, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if numero % linhas_por_bloco == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def write_parquet(rows, destino, row_group_size=20000):
+    """Grava as linhas em Parquet, um row group a cada `row_group_size` linhas.
+
+    Requer o pacote pyarrow. Retorna a quantidade de linhas gravadas.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (nome, pa.int64() if nome == 'id'
+         else pa.date32() if nome == 'data_agendamento'
+         else pa.time64('us') if nome == 'horario'
+         else pa.string())
+        for nome in RAW_HEADERS
+    ])
+
+    total = 0
+    with pq.ParquetWriter(destino, schema, compression='snappy') as writer:
+        colunas = [[] for _ in RAW_HEADERS]
+        for row in rows:
+            for coluna, valor in zip(colunas, row):
+                coluna.append(valor)
+            total += 1
+            if len(colunas[0]) >= row_group_size:
+                writer.write_table(pa.Table.from_arrays(colunas, schema=schema))
+                colunas = [[] for _ in RAW_HEADERS]
+        if colunas[0] or not total:
+            writer.write_table(pa.Table.from_arrays(colunas, schema=schema))
+    return total
+
+
+def _chunks_com_ultimo(itens, tamanho):
+    """Agrupa `itens` em listas de `tamanho`, indicando se cada lista é a última."""
+    anterior = None
+    atual = []
+    for item in itens:
+        atual.append(item)
+        if len(atual) == tamanho:
+            if anterior is not None:
+                yield anterior, False
+            anterior, atual = atual, []
+    if atual:
+        if anterior is not None:
+            yield anterior, False
+        yield atual, True
+    elif anterior is not None:
+        yield anterior, True
+
+
+def _renderizar_pdf(html, caminho):
+    """Diagrama `html` e grava o PDF em `caminho`; retorna a quantidade de páginas.
+
+    O documento do WeasyPrint (layout de todas as páginas) só existe durante
+    esta chamada.
+    """
+    from weasyprint import HTML
+
+    documento = HTML(string=html).render()
+    documento.write_pdf(caminho)
+    return len(documento.pages)
+
+
+def write_pdf_chunked(bookings, render_html, destino, chunk_size=500):
+    """Gera o PDF renderizando os agendamentos em blocos de `chunk_size` linhas.
+
+    O layout do WeasyPrint cresce de forma superlinear com o tamanho da
+    tabela; cada bloco é diagramado separadamente e gravado num PDF
+    temporário, liberando o layout antes do bloco seguinte, e os PDFs são
+    unidos (pypdf) no final. `render_html(bloco, primeiro, ultimo,
+    pagina_inicial, total)` devolve o HTML de um bloco: cabeçalho e filtros
+    só no primeiro, total de registros só no último, e a numeração de
+    páginas continua a partir de `pagina_inicial`.
+
+    Retorna a quantidade de páginas geradas.
+    """
+    from pypdf import PdfWriter
+
+    paginas = 0
+    total = 0
+
+    with tempfile.TemporaryDirectory(prefix='pdf_blocos_') as diretorio:
+        partes = []
+        for numero, (bloco, ultimo) in enumerate(_chunks_com_ultimo(bookings, chunk_size)):
+            total += len(bloco)
+            parte = os.path.join(diretorio, f'{numero:06d}.pdf')
+            paginas += _renderizar_pdf(render_html(bloco, numero == 0, ultimo, paginas, total), parte)
+            partes.append(parte)
+
+        if not partes:
+            # Sem agendamentos: um único documento com a mensagem de "nenhum encontrado"
+            partes.append(os.path.join(diretorio, 'vazio.pdf'))
+            paginas = _renderizar_pdf(render_html([], True, True, 0, 0), partes[0])
+
+        writer = PdfWriter()
+        for parte in partes:
+            writer.append(parte)
+        writer.write(destino)
+        writer.close()
+
+    return paginas
@@ -0,0 +1,229 @@
+"""Busca textual dos agendamentos com o índice FTS5 do SQLite.
+
+A tabela virtual `agendamento_busca` guarda uma cópia das colunas pesquisáveis
+de cada agendamento (rowid = agendamento.id) e é mantida por triggers, então
+também acompanha alterações feitas fora do ORM. O tokenizador `unicode61` com
+`remove_diacritics 2` ignora acentos: "matricula" encontra "Matrícula".
+
+Em bancos sem FTS5 (ou que não sejam SQLite) a busca volta ao `ilike`.
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy import and_, or_, event, column, literal_column, select, table, text
+
+from models import Agendamento
+
+TABELA_BUSCA = 'agendamento_busca'
+
+# Colunas de Agendamento cobertas pela busca livre
+COLUNAS_BUSCA = (
+    'canal', 'setor', 'status', 'categoria',
+    'nome_responsavel_1', 'nome_responsavel_2', 'aluno',
+)
+
+agendamento_busca = table(
+    TABELA_BUSCA,
+    column('rowid'),
+    column('rank'),
+)
+
+# Nome gravado no índice para cada coluna: os textos vêm direto da linha e
+# canal/setor/status/categoria vêm das tabelas de referência (pelo id)
+_REFERENCIAS = {
+    'canal': ('canal', 'canal_id'),
+    'setor': ('setor', 'setor_id'),
+    'status': ('status', 'status_id'),
+    'categoria': ('categoria', 'categoria_id'),
+}
+_COLUNAS_TEXTO = ('nome_responsavel_1', 'nome_responsavel_2', 'aluno')
+
+
+def _valores(linha):
+    """Expressões SQL com o valor de cada coluna do índice para `linha` (new ou a)."""
+    valores = [
+        f'(SELECT nome FROM {tabela} WHERE id = {linha}.{coluna_id})'
+        for tabela, coluna_id in _REFERENCIAS.values()
+    ]
+    return ', '.join(valores + [f'{linha}.{coluna}' for coluna in _COLUNAS_TEXTO])
+
+
+_COLUNAS = ', '.join(list(_REFERENCIAS) + list(_COLUNAS_TEXTO))
+_ORIGEM = ', '.join([coluna_id for _, coluna_id in _REFERENCIAS.values()] + list(_COLUNAS_TEXTO))
+
+DDL_BUSCA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_BUSCA} USING fts5(
+        {_COLUNAS},
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS agendamento_busca_ai AFTER INSERT ON agendamento BEGIN
+        INSERT INTO {TABELA_BUSCA}(rowid, {_COLUNAS}) VALUES (new.id, {_valores('new')});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS agendamento_busca_ad AFTER DELETE ON agendamento BEGIN
+        DELETE FROM {TABELA_BUSCA} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS agendamento_busca_au AFTER UPDATE OF {_ORIGEM} ON agendamento BEGIN
+        DELETE FROM {TABELA_BUSCA} WHERE rowid = old.id;
+        INSERT INTO {TABELA_BUSCA}(rowid, {_COLUNAS}) VALUES (new.id, {_valores('new')});
+    END""",
+] + [
+    # Renomear um canal/setor/status/categoria atualiza só o índice, não os agendamentos
+    f"""CREATE TRIGGER IF NOT EXISTS {tabela}_busca_au AFTER UPDATE OF nome ON {tabela} BEGIN
+        UPDATE {TABELA_BUSCA} SET {coluna} = new.nome
+        WHERE rowid IN (SELECT id FROM agendamento WHERE {coluna_id} = new.id);
+    END"""
+    for coluna, (tabela, coluna_id) in _REFERENCIAS.items()
+]
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+# CPF com ou sem pontuação: 12345678901 ou 123.456.789-01
+_CPF = re.compile(r'^\d{3}\.?\d{3}\.?\d{3}-?\d{2}$')
+
+# Engines em que o índice já foi encontrado
+_engines_com_busca = set()
+
+
+def fts5_suportado(connection):
+    """Indica se o SQLite da conexão foi compilado com FTS5."""
+    if connection.dialect.name != 'sqlite':
+        return False
+    opcoes = {linha[0] for linha in connection.exec_driver_sql('PRAGMA compile_options')}
+    return 'ENABLE_FTS5' in opcoes
+
+
+def instalar_busca(connection):
+    """Cria a tabela FTS5 e as triggers de sincronização, se possível."""
+    if not fts5_suportado(connection):
+        return False
+    for ddl in DDL_BUSCA:
+        connection.exec_driver_sql(ddl)
+    return True
+
+
+def reconstruir_busca(connection):
+    """Recarrega o índice de busca a partir da tabela agendamento."""
+    connection.exec_driver_sql(f'DELETE FROM {TABELA_BUSCA}')
+    connection.exec_driver_sql(
+        f'INSERT INTO {TABELA_BUSCA}(rowid, {_COLUNAS}) SELECT a.id, {_valores("a")} FROM agendamento a'
+    )
+    connection.exec_driver_sql(f"INSERT INTO {TABELA_BUSCA}({TABELA_BUSCA}) VALUES ('optimize')")
+    return connection.exec_driver_sql(f'SELECT count(*) FROM {TABELA_BUSCA}').scalar()
+
+
+def busca_desatualizada(connection):
+    """Indica se o índice de busca não acompanha a tabela agendamento."""
+    indexados = connection.exec_driver_sql(f'SELECT count(*) FROM {TABELA_BUSCA}').scalar()
+    total = connection.exec_driver_sql('SELECT count(*) FROM agendamento').scalar()
+    return indexados != total
+
+
+def busca_disponivel(session):
+    """Indica se a tabela FTS5 existe no banco da sessão."""
+    engine = session.get_bind()
+    if engine in _engines_com_busca:
+        return True
+    if engine.dialect.name != 'sqlite':
+        return False
+    existe = session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+        {'nome': TABELA_BUSCA}
+    ).first()
+    if existe:
+        _engines_com_busca.add(engine)
+    return bool(existe)
+
+
+@event.listens_for(Agendamento.__table__, 'after_create')
+def _criar_busca(target, connection, **kw):
+    instalar_busca(connection)
+
+
+def expressao_fts(termo):
+    """Converte um termo digitado em consulta FTS5: todas as palavras, por prefixo.
+
+    Cada palavra vai entre aspas, então operadores do FTS5 (AND, NEAR, "-", ...)
+    digitados pelo usuário são tratados como texto.
+    """
+    palavras = _TOKEN.findall(termo)
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def parse_data(termo):
+    for fmt in ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(termo, fmt).date()
+        except ValueError:
+            pass
+    return None
+
+
+def parse_cpf(termo):
+    """CPF normalizado (só dígitos, como gravado por `formatar_cpf`) ou None."""
+    if _CPF.match(termo):
+        return re.sub(r'\D', '', termo)
+    return None
+
+
+def _filtro_cpf(cpf):
+    # Cada lado do OR usa o índice da respectiva coluna
+    return or_(Agendamento.cpf_responsavel_1 == cpf, Agendamento.cpf_responsavel_2 == cpf)
+
+
+def _filtro_ilike(termo):
+    return [getattr(Agendamento, coluna).ilike(f"%{termo}%") for coluna in COLUNAS_BUSCA]
+
+
+def _ids_fts(expressao):
+    return select(agendamento_busca.c.rowid).where(
+        literal_column(TABELA_BUSCA).op('MATCH')(expressao)
+    )
+
+
+def aplicar_busca(query, termos, usar_fts=True, ordenar_por_relevancia=False):
+    """Filtra `query` para agendamentos que casam com todos os `termos`.
+
+    Cada termo casa se aparecer em qualquer coluna pesquisável ou, se for uma
+    data, se for a data do agendamento. Termos no formato de CPF buscam apenas
+    pelo CPF exato dos responsáveis. Com FTS5, os demais termos que não são
+    datas viram uma única consulta ao índice, que também fornece a relevância
+    (bm25).
+    """
+    cpfs = [parse_cpf(termo) for termo in termos]
+    for cpf in filter(None, cpfs):
+        query = query.filter(_filtro_cpf(cpf))
+    termos = [termo for termo, cpf in zip(termos, cpfs) if not cpf]
+
+    if not usar_fts:
+        filtros = []
+        for termo in termos:
+            or_filters = _filtro_ilike(termo)
+            data = parse_data(termo)
+            if data:
+                or_filters.append(Agendamento.data_agendamento == data)
+            filtros.append(or_(*or_filters))
+        return query.filter(and_(*filtros)) if filtros else query
+
+    expressoes = []
+    for termo in termos:
+        expressao = expressao_fts(termo)
+        data = parse_data(termo)
+        if data:
+            condicao = Agendamento.data_agendamento == data
+            if expressao:
+                condicao = or_(condicao, Agendamento.id.in_(_ids_fts(expressao)))
+            query = query.filter(condicao)
+        elif expressao:
+            expressoes.append(expressao)
+
+    if expressoes:
+        query = query.join(
+            agendamento_busca, agendamento_busca.c.rowid == Agendamento.id
+        ).filter(
+            literal_column(TABELA_BUSCA).op('MATCH')(' '.join(expressoes))
+        )
+        if ordenar_por_relevancia:
+            query = query.order_by(agendamento_busca.c.rank)
+
+    return query
@@ -1,123 +1,320 @@
-console.log('[DEBUG] SCRIPT JS carregado');
-
-const btnPreviewReport = document.getElementById('previewReport').addEventListener('click',previewReport);
-
-function previewReport() {
-    const form = document.getElementById('reportsForm'); // Alterado para 'reportsForm'
-    console.log('ENTROU NA FUNÇÃO DE PREVIEW REPORT')
-    const formData = new FormData(form);
-    
-    // Abre em nova aba
-    const previewWindow = window.open('', '_blank');
-    
-    fetch('/reports/preview/pdf', {
-        method: 'POST',
-        body: formData
-    })
-    .then(response => response.text())
-    .then(html => {
-        previewWindow.document.write(html);
-        previewWindow.document.close();
-    })
-    .catch(error => {
-        console.error('Erro:', error);
-        alert('Erro ao gerar visualização do relatório');
-    });
+// Busca rápida do dashboard: consulta /api/agendamentos/busca enquanto o usuário
+// digita e atualiza a tabela sem recarregar a página.
+// Alteração de status em lote: envia os agendamentos selecionados para
+// /api/agendamentos/status e atualiza as linhas com o resultado de cada um.
+
+function botaoBloqueado() {
+    const botao = document.createElement('button');
+    botao.type = 'button';
+    botao.className = 'btn btn-sm btn-secondary';
+    botao.disabled = true;
+    botao.textContent = 'Bloqueado';
+    return botao;
 }
 
-// Adicione o evento para o botão de exportar Excel
-document.getElementById('exportExcelBtn').addEventListener('click', function() {
-    const form = document.getElementById('reportsForm');
-    console.log('ENTROU NA FUNÇÃO DE EXPORTAR P/ EXCEL')
+document.addEventListener('DOMContentLoaded', () => {
+    const ATRASO_MS = 300;
 
-    form.action = "{{ url_for('export_excel') }}";
-    form.submit();
-});
+    const campo = document.getElementById('buscaAgendamentos');
+    const tabela = document.getElementById('tabelaAgendamentos');
+    if (!campo || !tabela) return;
 
-console.log('%c[DEBUG] Sistema de proteção de status iniciado', 'color: green; font-weight: bold;');
+    const form = campo.form;
+    const corpo = tabela.tBodies[0];
+    const paginacao = document.getElementById('paginacaoAgendamentos');
+    const carregarMaisBtn = document.getElementById('carregarMaisBtn');
+    const totalColunas = tabela.tHead.rows[0].cells.length;
 
-document.addEventListener('DOMContentLoaded', () => {
+    // Linhas renderizadas pelo servidor: reaproveitadas (com os formulários) quando aparecem na busca
+    const linhasOriginais = Array.from(corpo.rows);
+    const linhasPorId = new Map(
+        linhasOriginais.filter(linha => linha.dataset.id).map(linha => [linha.dataset.id, linha])
+    );
+
+    let temporizador = null;
+    let controlador = null;
+    let proximo = null;
+
+    function parametros(depois) {
+        const params = new URLSearchParams({ q: campo.value.trim() });
+        ['data', 'status', 'setor'].forEach(nome => {
+            const valor = form.elements[nome] && form.elements[nome].value;
+            if (valor) params.set(nome, valor);
+        });
+        if (depois) params.set('depois', depois);
+        return params;
+    }
+
+    function celula(texto) {
+        const td = document.createElement('td');
+        td.textContent = texto || '';
+        return td;
+    }
+
+    function novaLinha(item) {
+        const tr = document.createElement('tr');
+        tr.dataset.id = item.id;
+
+        const selecionar = document.createElement('input');
+        selecionar.type = 'checkbox';
+        selecionar.className = 'form-check-input selecionar-agendamento';
+        selecionar.value = item.id;
+        selecionar.setAttribute('aria-label', `Selecionar agendamento ${item.id}`);
+        const tdSelecionar = document.createElement('td');
+        tdSelecionar.appendChild(selecionar);
+        tr.appendChild(tdSelecionar);
+
+        [
+            item.id, item.data_agendamento, item.horario, item.canal, '',
+            item.nome_responsavel_1, item.cpf_responsavel_1,
+            item.nome_responsavel_2, item.cpf_responsavel_2
+        ].forEach(valor => tr.appendChild(celula(valor)));
+
+        const status = document.createElement('span');
+        status.className = item.status_class;
+        status.textContent = item.status;
+        const tdStatus = document.createElement('td');
+        tdStatus.className = 'col-status';
+        tdStatus.appendChild(status);
+        tr.appendChild(tdStatus);
+
+        const tdSetor = celula(item.setor);
+        tdSetor.className = 'col-setor';
+        tr.appendChild(tdSetor);
+
+        [item.aluno, item.escolaAluno, item.coordenador]
+            .forEach(valor => tr.appendChild(celula(valor)));
+
+        const acoes = document.createElement('td');
+        acoes.appendChild(botaoAcao(item));
+        tr.appendChild(acoes);
 
-    // Função para bloquear formulário
-    function lockForm(form) {
-        const select = form.querySelector('.status-select');
-        const textarea = form.querySelector('textarea');
-        const button = form.querySelector('.btn-update');
-        
-        if (select) select.disabled = true;
-        if (textarea) {
-            textarea.disabled = true;
-            textarea.readOnly = true;
+        return tr;
+    }
+
+    // Mesmas ações da tabela renderizada: admin edita e exclui, os demais abrem o modal de status
+    function botaoAcao(item) {
+        if (item.url) {
+            const acoes = document.createDocumentFragment();
+            const editar = document.createElement('a');
+            editar.href = item.url;
+            editar.className = 'btn btn-sm btn-warning';
+            editar.textContent = 'Editar';
+            acoes.append(editar, ' ');
+
+            const excluir = document.createElement('form');
+            excluir.action = item.excluir_url;
+            excluir.method = 'POST';
+            excluir.className = 'd-inline';
+            excluir.addEventListener('submit', e => {
+                if (!confirm('Tem certeza que deseja excluir?')) e.preventDefault();
+            });
+            const botaoExcluir = document.createElement('button');
+            botaoExcluir.type = 'submit';
+            botaoExcluir.className = 'btn btn-sm btn-danger';
+            botaoExcluir.textContent = 'Excluir';
+            excluir.appendChild(botaoExcluir);
+            acoes.appendChild(excluir);
+            return acoes;
         }
-        if (button) {
-            button.disabled = true;
-            button.classList.remove('btn-success');
-            button.classList.add('btn-secondary');
-            button.innerHTML = '<i class="bi bi-lock-fill"></i> Bloqueado';
+
+        if (item.bloqueado) {
+            return botaoBloqueado();
         }
-        
-        console.log(`🔒 Formulário bloqueado para agendamento`);
+
+        const botao = document.createElement('button');
+        botao.type = 'button';
+        botao.className = 'btn btn-sm btn-success btn-alterar-status';
+        botao.textContent = 'Alterar status';
+        Object.assign(botao.dataset, {
+            id: item.id,
+            action: item.checkout_url,
+            status: item.status,
+            setor: item.setor,
+            observacao: item.observacao || ''
+        });
+        return botao;
     }
 
-    // Processar formulários já bloqueados ao carregar
-    document.querySelectorAll('.agendamento-form[data-is-locked="true"]').forEach(form => {
-        lockForm(form);
-    });
+    function linhaVazia() {
+        const tr = document.createElement('tr');
+        const td = celula('Nenhum agendamento encontrado.');
+        td.colSpan = totalColunas;
+        td.className = 'text-center';
+        tr.appendChild(td);
+        return tr;
+    }
+
+    function modoBusca(ativo) {
+        if (paginacao) paginacao.hidden = ativo;
+        if (!ativo) carregarMaisBtn.hidden = true;
+    }
+
+    async function buscar(depois) {
+        // Cancela a requisição anterior: só a resposta da última digitação importa
+        if (controlador) controlador.abort();
+        controlador = new AbortController();
 
-    // Interceptar mudanças de status
-    document.querySelectorAll('.status-select').forEach(select => {
-        const agendamentoId = select.dataset.agendamentoId;
-        
-        select.addEventListener('change', function(e) {
-            const newStatus = this.value;
-            const form = this.closest('form');
-            const currentUserPerfil = '{{ current_user.perfil }}';
-            
-            console.log(`Status mudado para: ${newStatus} (Perfil: ${currentUserPerfil})`);
-            
-            // Se usuário da coordenação está mudando para "Apto-Coordenação"
-            if (currentUserPerfil !== 'financeiro' && 
-                currentUserPerfil !== 'admin' && 
-                newStatus === 'Apto-Coordenação') {
-                
-                if (confirm('⚠️ ATENÇÃO: Ao marcar como "Apto-Coordenação", este agendamento será enviado para o Financeiro e você NÃO poderá mais editá-lo.\n\nDeseja continuar?')) {
-                    console.log(`✅ Usuário confirmou mudança para Apto-Coordenação`);
-                } else {
-                    // Reverter para o valor anterior
-                    this.value = this.defaultValue;
-                    console.log(`❌ Usuário cancelou mudança para Apto-Coordenação`);
-                }
+        try {
+            const resposta = await fetch(`${campo.dataset.url}?${parametros(depois)}`, {
+                signal: controlador.signal,
+                headers: { 'Accept': 'application/json' }
+            });
+            const dados = await resposta.json();
+            if (!resposta.ok) {
+                throw new Error(dados.erro || `Erro ${resposta.status}`);
             }
-        });
-    });
 
-    // Interceptar submit dos formulários
-    document.querySelectorAll('.agendamento-form').forEach(form => {
-        form.addEventListener('submit', function(e) {
-            const isLocked = this.dataset.isLocked === 'true';
-            
-            if (isLocked) {
-                e.preventDefault();
-                alert('❌ Este agendamento está bloqueado pois já foi enviado para o Financeiro.');
-                console.log('🚫 Tentativa de submit bloqueada');
-                return false;
+            const linhas = dados.itens.map(item => linhasPorId.get(String(item.id)) || novaLinha(item));
+            if (depois) {
+                corpo.append(...linhas);
+            } else {
+                corpo.replaceChildren(...(linhas.length ? linhas : [linhaVazia()]));
             }
-            
-            const select = this.querySelector('.status-select');
-            const currentUserPerfil = '{{ current_user.perfil }}';
-            
-            if (select && select.value === 'Apto-Coordenação' && 
-                currentUserPerfil !== 'financeiro' && 
-                currentUserPerfil !== 'admin') {
-                
-                if (!confirm('⚠️ CONFIRMAÇÃO FINAL: Este agendamento será enviado para o Financeiro e você não poderá mais editá-lo.\n\nConfirma a atualização?')) {
-                    e.preventDefault();
-                    return false;
-                }
+
+            proximo = dados.proximo;
+            carregarMaisBtn.hidden = !proximo;
+            modoBusca(true);
+        } catch (erro) {
+            if (erro.name !== 'AbortError') {
+                console.error('Erro na busca:', erro);
             }
-        });
+        }
+    }
+
+    function restaurar() {
+        if (controlador) controlador.abort();
+        corpo.replaceChildren(...linhasOriginais);
+        modoBusca(false);
+    }
+
+    campo.addEventListener('input', () => {
+        clearTimeout(temporizador);
+        if (!campo.value.trim()) {
+            restaurar();
+            return;
+        }
+        temporizador = setTimeout(() => buscar(), ATRASO_MS);
     });
 
-    console.log('%c[DEBUG] Sistema de proteção configurado com sucesso', 'color: blue; font-weight: bold;');
+    // Mudanças nos filtros refazem a busca em andamento
+    form.addEventListener('change', evento => {
+        if (evento.target !== campo && campo.value.trim()) {
+            clearTimeout(temporizador);
+            buscar();
+        }
+    });
+
+    carregarMaisBtn.addEventListener('click', () => {
+        if (proximo) buscar(proximo);
+    });
 });
 
+document.addEventListener('DOMContentLoaded', () => {
+    const barra = document.getElementById('acoesEmLote');
+    const tabela = document.getElementById('tabelaAgendamentos');
+    if (!barra || !tabela) return;
+
+    const corpo = tabela.tBodies[0];
+    const selecionarTodos = document.getElementById('selecionarTodos');
+    const info = document.getElementById('selecionadosInfo');
+    const select = document.getElementById('statusEmLote');
+    const aplicar = document.getElementById('aplicarStatusEmLote');
+    const resultado = document.getElementById('resultadoEmLote');
+
+    // Apenas as linhas exibidas (a busca rápida troca as linhas da tabela)
+    function caixas() {
+        return Array.from(corpo.querySelectorAll('.selecionar-agendamento'));
+    }
+
+    function selecionados() {
+        return caixas().filter(caixa => caixa.checked).map(caixa => Number(caixa.value));
+    }
+
+    function atualizarSelecao() {
+        const total = selecionados().length;
+        info.textContent = total ? `${total} agendamento(s) selecionado(s)` : 'Nenhum agendamento selecionado';
+        aplicar.disabled = total === 0;
+        const todas = caixas();
+        selecionarTodos.checked = todas.length > 0 && total === todas.length;
+        selecionarTodos.indeterminate = total > 0 && total < todas.length;
+    }
+
+    function mostrarResultado(classe, linhas) {
+        resultado.className = `alert ${classe}`;
+        resultado.replaceChildren(...linhas.map(texto => {
+            const div = document.createElement('div');
+            div.textContent = texto;
+            return div;
+        }));
+    }
+
+    function atualizarLinha(item) {
+        const tr = corpo.querySelector(`tr[data-id="${item.id}"]`);
+        if (!tr) return;
+        tr.querySelector('.selecionar-agendamento').checked = false;
+
+        const status = tr.querySelector('.col-status span');
+        status.className = item.status_class;
+        status.textContent = item.status;
+        tr.querySelector('.col-setor').textContent = item.setor || '';
+
+        const botao = tr.querySelector('.btn-alterar-status');
+        if (!botao) return;
+        if (item.bloqueado) {
+            botao.replaceWith(botaoBloqueado());
+        } else {
+            botao.dataset.status = item.status;
+            botao.dataset.setor = item.setor || '';
+        }
+    }
+
+    selecionarTodos.addEventListener('change', () => {
+        caixas().forEach(caixa => { caixa.checked = selecionarTodos.checked; });
+        atualizarSelecao();
+    });
+
+    corpo.addEventListener('change', evento => {
+        if (evento.target.classList.contains('selecionar-agendamento')) atualizarSelecao();
+    });
+
+    new MutationObserver(atualizarSelecao).observe(corpo, { childList: true });
+
+    aplicar.addEventListener('click', async () => {
+        const ids = selecionados();
+        const status = select.value;
+        if (!ids.length) return;
+
+        // Coordenação: o status que envia ao Financeiro bloqueia a edição, como no modal
+        const confirmacao = barra.dataset.confirmacao;
+        const mensagem = status === confirmacao
+            ? `Marcar ${ids.length} agendamento(s) como "${status}" e enviá-los ao Financeiro? Você não poderá mais editá-los.`
+            : `Alterar o status de ${ids.length} agendamento(s) para "${status}"?`;
+        if (!confirm(mensagem)) return;
+
+        aplicar.disabled = true;
+        try {
+            const resposta = await fetch(barra.dataset.url, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+                body: JSON.stringify({ ids, status })
+            });
+            const dados = await resposta.json();
+            if (!resposta.ok) {
+                throw new Error(dados.erro || `Erro ${resposta.status}`);
+            }
+
+            const falhas = dados.resultados.filter(item => !item.ok);
+            dados.resultados.filter(item => item.ok).forEach(atualizarLinha);
+            mostrarResultado(
+                falhas.length ? 'alert-warning' : 'alert-success',
+                [`${dados.atualizados} agendamento(s) alterado(s) para "${dados.status}".`]
+                    .concat(falhas.map(item => `#${item.id}: ${item.erro}`))
+            );
+        } catch (erro) {
+            mostrarResultado('alert-danger', [erro.message]);
+        } finally {
+            atualizarSelecao();
+        }
+    });
+});